@@ -0,0 +1,187 @@
+import hmac
+import math
+import threading
+from config import Config
+
+# Time-taken histogram: geometric buckets from 1 second up to about 3 days.
+# Every key keeps the same fixed number of counters however many tests it sees.
+TIME_BUCKET_BASE = 1.0
+TIME_BUCKET_RATIO = 1.5
+TIME_BUCKETS = 32
+
+DIMENSIONS = ("overall", "topic", "difficulty", "session", "question_type")
+
+
+class RunningStats:
+    """Count, mean, variance, min and max updated one value at a time (Welford)"""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def summary(self):
+        variance = self.m2 / (self.count - 1) if self.count > 1 else 0.0
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 2),
+            "stddev": round(math.sqrt(variance), 2),
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class TimeSketch:
+    """Fixed-size histogram giving approximate quantiles of durations"""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts = [0] * TIME_BUCKETS
+        self.total = 0
+
+    def add(self, seconds):
+        if seconds <= TIME_BUCKET_BASE:
+            bucket = 0
+        else:
+            bucket = int(math.log(seconds / TIME_BUCKET_BASE, TIME_BUCKET_RATIO)) + 1
+        self.counts[min(bucket, TIME_BUCKETS - 1)] += 1
+        self.total += 1
+
+    def quantile(self, q):
+        """Approximate q-quantile, within one bucket width"""
+        if not self.total:
+            return None
+        target = q * self.total
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                if bucket == 0:
+                    return TIME_BUCKET_BASE
+                # Geometric midpoint of the bucket
+                low = TIME_BUCKET_BASE * TIME_BUCKET_RATIO ** (bucket - 1)
+                return round(low * math.sqrt(TIME_BUCKET_RATIO), 1)
+        return None
+
+
+class Aggregate:
+    """Running totals for one (dimension, key) pair"""
+
+    __slots__ = ("score", "time_taken", "questions", "correct")
+
+    def __init__(self):
+        self.score = RunningStats()  # percentage per test (per question for question types)
+        self.time_taken = TimeSketch()
+        self.questions = 0
+        self.correct = 0
+
+    def summary(self):
+        return {
+            "score": self.score.summary(),
+            "time_taken": {
+                "p50": self.time_taken.quantile(0.5),
+                "p90": self.time_taken.quantile(0.9),
+            },
+            "questions": self.questions,
+            "accuracy": round(self.correct / self.questions * 100, 2) if self.questions else 0,
+        }
+
+
+class AnalyticsStore:
+    """Learning analytics updated incrementally as each test completes.
+
+    Each completed test updates a handful of aggregates (overall, its topic,
+    difficulty and session, and each question type it contained), so queries
+    never rescan past tests and each key's state has a fixed size.
+
+    Session ids also identify chat sessions, so sessions are stored under a
+    keyed hash of the id rather than the id itself.
+    """
+
+    def __init__(self, secret=None):
+        self._secret = (secret or Config().SECRET_KEY).encode('utf-8')
+        self._aggregates = {dimension: {} for dimension in DIMENSIONS}
+        self._lock = threading.Lock()
+
+    def _session_key(self, session_id):
+        return hmac.new(self._secret, session_id.encode('utf-8'), 'sha256').hexdigest()[:32]
+
+    def _aggregate(self, dimension, key):
+        aggregates = self._aggregates[dimension]
+        aggregate = aggregates.get(key)
+        if aggregate is None:
+            aggregate = aggregates[key] = Aggregate()
+        return aggregate
+
+    def record(self, results):
+        """Fold one test's results into the aggregates"""
+        if not results.get("total_questions"):
+            return
+
+        keys = [
+            ("overall", "all"),
+            ("topic", results["topic"].lower().strip()),
+            ("difficulty", str(results["difficulty"]).lower()),
+        ]
+        if results.get("session_id"):
+            keys.append(("session", self._session_key(results["session_id"])))
+
+        with self._lock:
+            for dimension, key in keys:
+                aggregate = self._aggregate(dimension, key)
+                aggregate.score.add(results["percentage"])
+                aggregate.time_taken.add(results["time_taken"])
+                aggregate.questions += results["total_questions"]
+                aggregate.correct += results["correct_answers"]
+
+            for result in results.get("detailed_results", []):
+                aggregate = self._aggregate("question_type", (result.get("type") or "unknown").lower())
+                aggregate.score.add(100.0 if result["is_correct"] else 0.0)
+                aggregate.questions += 1
+                aggregate.correct += 1 if result["is_correct"] else 0
+
+    def get(self, dimension, key):
+        """Summary for one key, or None if nothing has been recorded for it.
+
+        For the session dimension, key is the session id.
+        """
+        if dimension not in self._aggregates:
+            return None
+        key = self._session_key(key) if dimension == "session" else key.lower()
+        with self._lock:
+            aggregate = self._aggregates[dimension].get(key)
+            return aggregate.summary() if aggregate else None
+
+    def keys(self, dimension):
+        """Keys recorded for a dimension; sessions are listed by their hashes"""
+        with self._lock:
+            return sorted(self._aggregates.get(dimension, {}))
+
+    def overview(self):
+        """Overall summary with per-difficulty and per-question-type breakdowns"""
+        with self._lock:
+            overall = self._aggregates["overall"].get("all")
+            return {
+                "overall": overall.summary() if overall else None,
+                "difficulty": {
+                    key: aggregate.summary()
+                    for key, aggregate in self._aggregates["difficulty"].items()
+                },
+                "question_type": {
+                    key: aggregate.summary()
+                    for key, aggregate in self._aggregates["question_type"].items()
+                },
+            }
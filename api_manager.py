@@ -1,6 +1,8 @@
 import requests
 import json
+import time
 from config import Config
+from model_router import ModelRouter
 import logging
 
 # Set up logging
@@ -8,8 +10,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class APIManager:
+    # Client errors that would fail the same way on any model
+    NON_RETRYABLE_STATUS = {400, 401, 403}
+    
     def __init__(self):
         self.config = Config()
+        self.router = ModelRouter(self.config)
         # Gemini API endpoint
         self.api_base = "https://generativelanguage.googleapis.com/v1beta"
         # Gemini API uses a different header
@@ -17,12 +23,18 @@ class APIManager:
             "Content-Type": "application/json"
         }
     
-    def make_gemini_request(self, prompt_text, model=None, temperature=None, max_tokens=None):
-        """Make a request to Google Gemini API"""
+    def make_gemini_request(self, prompt_text, model=None, temperature=None, max_tokens=None, call_site="chat"):
+        """Make a request to Google Gemini API
+        
+        Unless a model is given, the router picks the model and output limit
+        for the call site and falls back to the next model if the call fails.
+        """
         if not self.config.GEMINI_API_KEY:
             logger.error("Gemini API key not configured")
             return {"error": "Gemini API key not configured"}
         
+        route = self.router.route(call_site)
+        
         # Construct the request payload for Gemini
         data = {
             "contents": [{
@@ -32,11 +44,30 @@ class APIManager:
             }],
             "generationConfig": {
                 "temperature": temperature if temperature is not None else self.config.GEMINI_TEMPERATURE,
-                "maxOutputTokens": max_tokens if max_tokens is not None else self.config.GEMINI_MAX_TOKENS,
+                "maxOutputTokens": max_tokens if max_tokens is not None else route["max_tokens"],
             }
         }
         
-        model_name = model or self.config.GEMINI_MODEL
+        models = [model] if model else self.router.candidates(call_site, len(prompt_text))
+        
+        for model_name in models:
+            started = time.monotonic()
+            response, retryable = self._post(model_name, data, route["timeout"])
+            
+            if "error" not in response:
+                self.router.record(model_name, time.monotonic() - started, True, call_site, len(prompt_text))
+                return response
+            
+            if not retryable:
+                break
+            
+            self.router.record(model_name, time.monotonic() - started, False, call_site, len(prompt_text))
+            logger.warning(f"Gemini model {model_name} failed for {call_site}, trying next model")
+        
+        return response
+    
+    def _post(self, model_name, data, timeout):
+        """Send one generateContent request, returning (response, retryable)"""
         # The API key is passed as a query parameter
         url = f"{self.api_base}/models/{model_name}:generateContent?key={self.config.GEMINI_API_KEY}"
         
@@ -45,19 +76,20 @@ class APIManager:
                 url,
                 headers=self.headers,
                 json=data,
-                timeout=60
+                timeout=timeout
             )
             
             if response.status_code == 200:
-                return response.json()
+                return response.json(), False
             else:
                 logger.error(f"Gemini API error: {response.status_code} - {response.text}")
-                return {"error": f"API error: {response.status_code}"}
+                retryable = response.status_code not in self.NON_RETRYABLE_STATUS
+                return {"error": f"API error: {response.status_code}"}, retryable
         except Exception as e:
             logger.error(f"Error making Gemini request: {str(e)}")
-            return {"error": str(e)}
+            return {"error": str(e)}, True
     
-    def get_chatbot_response(self, messages):
+    def get_chatbot_response(self, messages, call_site="chat"):
         """Get a response from the chatbot"""
         # Gemini API takes a single prompt text, so we need to format the messages
         # into a single string. We'll create a simple history string.
@@ -73,7 +105,7 @@ class APIManager:
                 # Add system prompt at the beginning
                 prompt_text = f"{content}\n\n{prompt_text}"
         
-        response = self.make_gemini_request(prompt_text)
+        response = self.make_gemini_request(prompt_text, call_site=call_site)
         
         if "error" in response:
             return {"error": response["error"]}
@@ -88,12 +120,12 @@ class APIManager:
         except (KeyError, IndexError):
             return {"error": "Invalid response format from Gemini"}
     
-    def generate_test_questions(self, topic, num_questions, difficulty, question_types):
-        """Generate test questions on a specific topic"""
+    def test_questions_prompt(self, topic, num_questions, difficulty, question_types):
+        """Build the prompt used by generate_test_questions"""
         types_str = ", ".join(question_types)
         
         # Simplified prompt to reduce the chance of errors
-        prompt = f"""Create a JSON object with a single key "questions". 
+        return f"""Create a JSON object with a single key "questions". 
         The value should be a list of {num_questions} test questions about {topic}.
         Difficulty: {difficulty}. Types: {types_str}.
         
@@ -113,9 +145,13 @@ class APIManager:
         }}
         
         Return only the raw JSON object. No other text."""
+    
+    def generate_test_questions(self, topic, num_questions, difficulty, question_types):
+        """Generate test questions on a specific topic"""
+        prompt = self.test_questions_prompt(topic, num_questions, difficulty, question_types)
         
-        # Increased max_tokens to give the AI more room
-        response = self.make_gemini_request(prompt, max_tokens=3000)
+        # The test_generation route allows far more output than a chat reply
+        response = self.make_gemini_request(prompt, call_site="test_generation")
         
         if "error" in response:
             return {"error": response["error"]}
@@ -1,22 +1,20 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Blueprint, Flask, Response, current_app, render_template, request, redirect, url_for, flash, jsonify, session, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import uuid
 from config import Config
-from chatbot import ChatBot
-from test_simulator import TestSimulator
-from knowledge_base import KnowledgeBase
+from material_index import allowed_file
+from analytics import DIMENSIONS
+from job_queue import PRIORITIES, QueueFull
+from profiler import ProfilerBusy, SamplingProfiler
+from assets import build_assets, load_manifest
+from responses import finalize_json, send_asset
+import hmac
+import json
+import queue
+import components
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-# Initialize components
-chatbot = ChatBot()
-test_simulator = TestSimulator()
-knowledge_base = KnowledgeBase()
+bp = Blueprint('main', __name__)
 
 # --- NEW: Simple in-memory store for dashboard stats ---
 # In a real app, you would use a database. This is just for demonstration.
@@ -28,15 +26,61 @@ app_data = {
     "study_time_minutes": 0
 }
 
-@app.route('/')
+def _record_test_completion(event, test_id, results):
+    """Fold completed tests into the dashboard stats, however they completed"""
+    if event != "completed":
+        return
+    
+    if "correct_answers" in results and "total_questions" in results:
+        app_data["tests_completed"] += 1
+        app_data["total_score"] += results["correct_answers"]
+        app_data["total_questions"] += results["total_questions"]
+        # Assuming time_taken is in seconds, convert to minutes
+        if "time_taken" in results:
+            app_data["study_time_minutes"] += round(results["time_taken"] / 60)
+    
+    components.get_analytics().record(results)
+
+components.add_test_listener(_record_test_completion)
+
+def _token_matches(supplied, token):
+    """Constant-time token check that copes with any header value"""
+    if not token or not supplied:
+        return False
+    return hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+def _session_owner():
+    """Opaque id for the browser session, used to keep its uploads to itself"""
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+    key = current_app.config['SECRET_KEY'].encode('utf-8')
+    return hmac.new(key, session['session_id'].encode('utf-8'), 'sha256').hexdigest()[:32]
+
+def _job_priority(data):
+    """Only callers holding JOB_PRIORITY_TOKEN may move their jobs up or down the queue"""
+    priority = data.get('priority')
+    if isinstance(priority, str) and priority in PRIORITIES and \
+            _token_matches(request.headers.get('X-Priority-Token'), current_app.config['JOB_PRIORITY_TOKEN']):
+        return priority
+    return 'normal'
+
+def _job_accepted(job_id, **fields):
+    """202 response pointing the client at a queued job"""
+    body = dict(fields, job_id=job_id, status="queued",
+                status_url=url_for('main.api_job_status', job_id=job_id))
+    if current_app.config['EVENT_STREAMS']:
+        body["events_url"] = url_for('main.api_job_events', job_id=job_id)
+    return jsonify(body), 202
+
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def dashboard():
     return render_template('dashboard.html')
 
-@app.route('/chat')
+@bp.route('/chat')
 def chat():
     # Generate a unique session ID if not exists
     if 'session_id' not in session:
@@ -44,16 +88,16 @@ def chat():
     
     return render_template('chat.html', session_id=session['session_id'])
 
-@app.route('/test')
+@bp.route('/test')
 def test():
     return render_template('test.html')
 
-@app.route('/settings')
+@bp.route('/settings')
 def settings():
     return render_template('settings.html')
 
 # --- NEW: API endpoint to get dashboard stats ---
-@app.route('/api/dashboard/stats')
+@bp.route('/api/dashboard/stats')
 def api_dashboard_stats():
     """Return real-time dashboard statistics"""
     avg_score = 0
@@ -70,7 +114,7 @@ def api_dashboard_stats():
     })
 
 # API Routes
-@app.route('/api/chat', methods=['POST'])
+@bp.route('/api/chat', methods=['POST'])
 def api_chat():
     data = request.get_json()
     
@@ -85,14 +129,16 @@ def api_chat():
     app_data["chat_sessions"] += 1
     
     # Get response from chatbot
-    response = chatbot.get_response(session_id, data['message'])
+    response = components.get_chatbot().get_response(
+        session_id, data['message'], materials_owner=_session_owner()
+    )
     
     return jsonify({
         "response": response["response"],
         "session_id": session_id
     })
 
-@app.route('/api/test/create', methods=['POST'])
+@bp.route('/api/test/create', methods=['POST'])
 def api_test_create():
     """Create a new test"""
     data = request.get_json()
@@ -106,15 +152,134 @@ def api_test_create():
     question_types = data.get('question_types', ['multiple choice', 'true/false'])
     duration = data.get('duration', 30)
     
-    # Create test
-    test = test_simulator.create_test(topic, num_questions, difficulty, question_types, duration)
+    priority = _job_priority(data)
+    # Analytics for a session are only shown to that browser, so tests are
+    # attributed to the session cookie rather than to an id in the request
+    session_id = session.get('session_id')
+    
+    # Generation takes seconds, so it runs in the background and the client
+    # waits on the job instead of holding this worker
+    try:
+        job_id = components.get_job_queue().submit(
+            components.get_test_simulator().create_test,
+            topic, num_questions, difficulty, question_types, duration,
+            session_id=session_id,
+            priority=priority
+        )
+    except QueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    return _job_accepted(job_id)
+
+@bp.route('/api/class/create', methods=['POST'])
+def api_class_create():
+    """Create the same test for every student in a class from one question set"""
+    data = request.get_json()
     
-    if "error" in test:
-        return jsonify(test), 400
+    if not data or 'topic' not in data:
+        return jsonify({"error": "No topic provided"}), 400
     
-    return jsonify(test)
+    # Either a list of student names or just a head count
+    students = data.get('students')
+    if students is None:
+        try:
+            num_students = int(data.get('num_students', 0))
+        except (TypeError, ValueError):
+            return jsonify({"error": "num_students must be an integer"}), 400
+        if num_students > Config.MAX_CLASS_SIZE:
+            return jsonify({"error": f"A class can have at most {Config.MAX_CLASS_SIZE} students"}), 400
+        students = [f"Student {i + 1}" for i in range(num_students)]
+    elif not isinstance(students, list) or \
+            not all(isinstance(student, str) and student.strip() for student in students):
+        return jsonify({"error": "students must be a list of names"}), 400
+    
+    if not students:
+        return jsonify({"error": "No students provided"}), 400
+    if len(students) > Config.MAX_CLASS_SIZE:
+        return jsonify({"error": f"A class can have at most {Config.MAX_CLASS_SIZE} students"}), 400
+    
+    topic = data['topic']
+    num_questions = data.get('num_questions', 10)
+    difficulty = data.get('difficulty', 'medium')
+    question_types = data.get('question_types', ['multiple choice', 'true/false'])
+    duration = data.get('duration', 30)
+    shuffle = data.get('shuffle', True)
+    
+    try:
+        job_id = components.get_job_queue().submit(
+            components.get_test_simulator().create_class_tests,
+            topic, num_questions, difficulty, question_types, duration, students, shuffle,
+            priority=_job_priority(data)
+        )
+    except QueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    return _job_accepted(job_id)
 
-@app.route('/api/test/start', methods=['POST'])
+@bp.route('/api/class/<class_id>/results')
+def api_class_results(class_id):
+    """Results rollup for a class"""
+    result = components.get_test_simulator().get_class_results(class_id)
+    
+    if "error" in result:
+        return jsonify(result), 404
+    
+    return jsonify(result)
+
+@bp.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """Get the status of a background job"""
+    job = components.get_job_queue().get(job_id)
+    
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    return jsonify(job)
+
+@bp.route('/api/jobs/<job_id>/events')
+def api_job_events(job_id):
+    """Stream job status changes as server-sent events"""
+    # Each open stream holds a worker, so streams need a cooperative server
+    if not current_app.config['EVENT_STREAMS']:
+        return jsonify({"error": "Event streams are disabled; poll the job status instead"}), 404
+    
+    job_queue = components.get_job_queue()
+    
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    def generate():
+        last_status = None
+        while True:
+            job = job_queue.wait(job_id, last_status, timeout=15)
+            if job is None:
+                yield 'event: failed\ndata: {"error": "Job not found"}\n\n'
+                return
+            if job["status"] == last_status:
+                # Keep the connection alive through proxies
+                yield ": keep-alive\n\n"
+                continue
+            last_status = job["status"]
+            yield f"event: {last_status}\ndata: {json.dumps(job)}\n\n"
+            if last_status in ("done", "failed"):
+                return
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/api/jobs/stats')
+def api_job_stats():
+    """Queue depth, wait time and run time of background jobs"""
+    return jsonify(components.get_job_queue().stats())
+
+@bp.route('/api/test/start', methods=['POST'])
 def api_test_start():
     """Start a test"""
     data = request.get_json()
@@ -124,15 +289,21 @@ def api_test_start():
     
     test_id = data['test_id']
     
+    # The event hub must be listening before the test starts so its timers are scheduled
+    components.get_test_events()
+    
     # Start test
-    result = test_simulator.start_test(test_id)
+    result = components.get_test_simulator().start_test(test_id)
     
     if "error" in result:
         return jsonify(result), 400
     
+    if current_app.config['EVENT_STREAMS']:
+        result["events_url"] = url_for('main.api_test_events', test_id=test_id)
+    
     return jsonify(result)
 
-@app.route('/api/test/question', methods=['POST'])
+@bp.route('/api/test/question', methods=['POST'])
 def api_test_question():
     """Get the next question in a test"""
     data = request.get_json()
@@ -143,14 +314,14 @@ def api_test_question():
     test_id = data['test_id']
     
     # Get next question
-    result = test_simulator.get_next_question(test_id)
+    result = components.get_test_simulator().get_next_question(test_id)
     
     if "error" in result:
         return jsonify(result), 400
     
     return jsonify(result)
 
-@app.route('/api/test/answer', methods=['POST'])
+@bp.route('/api/test/answer', methods=['POST'])
 def api_test_answer():
     """Submit an answer for a test question"""
     data = request.get_json()
@@ -162,14 +333,14 @@ def api_test_answer():
     answer = data['answer']
     
     # Submit answer
-    result = test_simulator.submit_answer(test_id, answer)
+    result = components.get_test_simulator().submit_answer(test_id, answer)
     
     if "error" in result:
         return jsonify(result), 400
     
     return jsonify(result)
 
-@app.route('/api/test/complete', methods=['POST'])
+@bp.route('/api/test/complete', methods=['POST'])
 def api_test_complete():
     """Complete a test and get results"""
     data = request.get_json()
@@ -180,23 +351,34 @@ def api_test_complete():
     test_id = data['test_id']
     
     # Complete test
-    result = test_simulator.complete_test(test_id)
+    result = components.get_test_simulator().complete_test(test_id)
     
     if "error" in result:
         return jsonify(result), 400
     
-    # --- MODIFIED: Update stats when a test is completed ---
-    if "correct_answers" in result and "total_questions" in result:
-        app_data["tests_completed"] += 1
-        app_data["total_score"] += result["correct_answers"]
-        app_data["total_questions"] += result["total_questions"]
-        # Assuming time_taken is in seconds, convert to minutes
-        if "time_taken" in result:
-            app_data["study_time_minutes"] += round(result["time_taken"] / 60)
+    # Dashboard stats are updated by _record_test_completion
+    return jsonify(result)
+
+@bp.route('/api/test/<test_id>/status')
+def api_test_status_get(test_id):
+    """Get the status of a test; cacheable, so an unchanged status costs a 304"""
+    test_simulator = components.get_test_simulator()
+    result = test_simulator.get_test_status(test_id)
+    
+    if "error" in result:
+        return jsonify(result), 404
+    
+    # time_remaining changes on every call and would defeat the ETag; the
+    # deadline does not, and clients count down to it themselves
+    if "time_remaining" in result:
+        test = test_simulator.active_tests[test_id]
+        del result["time_remaining"]
+        if test["start_time"]:
+            result["ends_at"] = round(test["start_time"].timestamp() + test["duration"] * 60, 3)
     
     return jsonify(result)
 
-@app.route('/api/test/status', methods=['POST'])
+@bp.route('/api/test/status', methods=['POST'])
 def api_test_status():
     """Get the status of a test"""
     data = request.get_json()
@@ -207,23 +389,263 @@ def api_test_status():
     test_id = data['test_id']
     
     # Get test status
-    result = test_simulator.get_test_status(test_id)
+    result = components.get_test_simulator().get_test_status(test_id)
     
     if "error" in result:
         return jsonify(result), 400
     
     return jsonify(result)
 
-@app.route('/api/clear_chat', methods=['POST'])
+@bp.route('/api/test/<test_id>/events')
+def api_test_events(test_id):
+    """Stream time-remaining checkpoints and the final results as server-sent events"""
+    # Each open stream holds a worker for the whole test, so streams need a
+    # cooperative server
+    if not current_app.config['EVENT_STREAMS']:
+        return jsonify({"error": "Event streams are disabled; poll the test status instead"}), 404
+    
+    test_simulator = components.get_test_simulator()
+    
+    if test_id not in test_simulator.active_tests:
+        return jsonify({"error": "Test not found"}), 404
+    
+    test_events = components.get_test_events()
+    events = test_events.subscribe(test_id)
+    
+    def generate():
+        try:
+            # Start with the current state so a reconnecting client catches up
+            status = test_simulator.get_test_status(test_id)
+            if "detailed_results" in status or status.get("status") == "completed":
+                yield f"event: completed\ndata: {json.dumps(test_simulator.complete_test(test_id))}\n\n"
+                return
+            yield f"event: tick\ndata: {json.dumps(status)}\n\n"
+            
+            while True:
+                try:
+                    event, data = events.get(timeout=15)
+                except queue.Empty:
+                    # Keep the connection alive through proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                if event == "completed":
+                    return
+        finally:
+            test_events.unsubscribe(test_id, events)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/api/test/events/stats')
+def api_test_events_stats():
+    """Open event streams and pending timers"""
+    return jsonify(components.get_test_events().stats())
+
+@bp.route('/api/clear_chat', methods=['POST'])
 def api_clear_chat():
     """Clear the chat history"""
     data = request.get_json()
     session_id = data.get('session_id', str(uuid.uuid4()))
     
     # Clear conversation
-    chatbot.clear_conversation(session_id)
+    components.get_chatbot().clear_conversation(session_id)
     
     return jsonify({"status": "success", "session_id": session_id})
 
+@bp.route('/api/analytics/overview')
+def api_analytics_overview():
+    """Overall, per-difficulty and per-question-type learning analytics"""
+    return jsonify(components.get_analytics().overview())
+
+@bp.route('/api/analytics/<dimension>')
+def api_analytics_keys(dimension):
+    """List the keys recorded for a dimension (topic, difficulty, session, question_type).
+
+    Other browsers' sessions are never listed, only the caller's own.
+    """
+    if dimension not in DIMENSIONS:
+        return jsonify({"error": "Unknown dimension"}), 404
+    
+    analytics = components.get_analytics()
+    if dimension == "session":
+        own = session.get('session_id')
+        keys = [own] if own and analytics.get("session", own) else []
+    else:
+        keys = analytics.keys(dimension)
+    
+    return jsonify({"dimension": dimension, "keys": keys})
+
+@bp.route('/api/analytics/<dimension>/<path:key>')
+def api_analytics_key(dimension, key):
+    """Learning analytics for one topic, difficulty, session or question type"""
+    if dimension not in DIMENSIONS:
+        return jsonify({"error": "Unknown dimension"}), 404
+    
+    # Only the caller's own session can be looked up
+    if dimension == "session" and key != session.get('session_id'):
+        return jsonify({"error": "No analytics recorded"}), 404
+    
+    summary = components.get_analytics().get(dimension, key)
+    
+    if summary is None:
+        return jsonify({"error": "No analytics recorded"}), 404
+    
+    return jsonify(dict(summary, dimension=dimension, key=key))
+
+@bp.route('/api/routing/stats')
+def api_routing_stats():
+    """Observed latency and error rate per model"""
+    return jsonify(components.get_api_manager().router.stats())
+
+@bp.route('/api/materials', methods=['GET'])
+def api_materials():
+    """List the shared study materials and this session's uploads"""
+    return jsonify({"files": components.get_material_index().list_files(_session_owner())})
+
+@bp.route('/api/materials/upload', methods=['POST'])
+def api_materials_upload():
+    """Upload a study material file and queue it for indexing"""
+    file = request.files.get('file')
+    
+    if not file or not file.filename:
+        return jsonify({"error": "No file provided"}), 400
+    
+    filename = secure_filename(file.filename)
+    if not filename or not allowed_file(filename):
+        return jsonify({"error": "Unsupported file type"}), 400
+    
+    # Uploads are only searched for the session that uploaded them
+    owner = _session_owner()
+    material_index = components.get_material_index()
+    path = material_index.path(filename, owner)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    # Werkzeug spools the upload to disk, so save() streams it
+    file.save(path)
+    
+    # Chunking a large file takes a while, so it is indexed in the background
+    try:
+        job_id = components.get_job_queue().submit(material_index.ingest, filename, owner)
+    except QueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    return _job_accepted(job_id, filename=filename)
+
+@bp.route('/api/materials/search', methods=['POST'])
+def api_materials_search():
+    """Search the uploaded study materials"""
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('query'), str):
+        return jsonify({"error": "No query provided"}), 400
+    
+    try:
+        k = int(data.get('k', Config.RETRIEVAL_TOP_K))
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer"}), 400
+    if not 0 < k <= Config.RETRIEVAL_MAX_K:
+        return jsonify({"error": f"k must be between 1 and {Config.RETRIEVAL_MAX_K}"}), 400
+    
+    results = components.get_material_index().search(data['query'], k, owner=_session_owner())
+    
+    return jsonify({"results": results})
+
+@bp.route('/api/admin/profile', methods=['POST'])
+def api_admin_profile():
+    """Sample the stacks of all request threads for a few seconds"""
+    token = current_app.config['PROFILER_TOKEN']
+    
+    # Report the endpoint as missing when profiling is not enabled
+    if not token:
+        return jsonify({"error": "Not found"}), 404
+    
+    if not _token_matches(request.headers.get('X-Profiler-Token'), token):
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        duration = float(data.get('duration', 10))
+        rate = int(data.get('rate', 100))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid duration or rate"}), 400
+    
+    if not 0 < duration <= current_app.config['PROFILER_MAX_DURATION']:
+        return jsonify({"error": f"Duration must be between 0 and {current_app.config['PROFILER_MAX_DURATION']} seconds"}), 400
+    if not 0 < rate <= current_app.config['PROFILER_MAX_RATE']:
+        return jsonify({"error": f"Rate must be between 1 and {current_app.config['PROFILER_MAX_RATE']} Hz"}), 400
+    
+    profiler = current_app.extensions.get('profiler')
+    if profiler is None:
+        profiler = current_app.extensions['profiler'] = SamplingProfiler(current_app.view_functions)
+    
+    try:
+        report = profiler.profile(duration, rate)
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    
+    # Collapsed stacks can be fed straight to flamegraph.pl or speedscope
+    if data.get('format') == 'collapsed':
+        return Response(report["collapsed"] + "\n", mimetype='text/plain')
+    
+    return jsonify(report)
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a content-hashed static asset"""
+    return send_asset(current_app.config['ASSET_OUTPUT_FOLDER'], filename)
+
+def create_app(config_object=Config):
+    """Create the Flask application.
+
+    Components are not built here; they are constructed on first use by the
+    request that needs them (see components.py), unless PRELOAD_COMPONENTS is set.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    
+    # Ensure upload folder exists
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    
+    app.register_blueprint(bp)
+    
+    # Fingerprinted static assets; pages fall back to the plain static
+    # files for anything missing from the manifest
+    app.config['ASSET_OUTPUT_FOLDER'] = os.path.join(app.root_path, app.config['ASSET_OUTPUT_FOLDER'])
+    if app.config['ASSET_BUILD_ON_STARTUP']:
+        app.extensions['assets'] = build_assets(app.static_folder, app.config['ASSET_OUTPUT_FOLDER'])
+    else:
+        app.extensions['assets'] = load_manifest(app.config['ASSET_OUTPUT_FOLDER'])
+    
+    @app.template_global()
+    def asset_url(filename):
+        hashed = app.extensions['assets'].get(filename)
+        if hashed:
+            return url_for('main.asset', filename=hashed)
+        return url_for('static', filename=filename)
+    
+    # ETags, 304s and compression for JSON responses
+    app.after_request(finalize_json)
+    
+    # Pick up materials added, changed or deleted outside the upload route.
+    # This runs in the background from a request rather than here, so no
+    # threads are started before a preloading server forks its workers.
+    if app.config['MATERIAL_REFRESH_SECONDS'] > 0:
+        @app.before_request
+        def refresh_materials():
+            components.refresh_materials(app.config['MATERIAL_REFRESH_SECONDS'])
+    
+    if app.config['PRELOAD_COMPONENTS']:
+        components.preload()
+    
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""Static asset pipeline.
+
+Minifies the CSS and JavaScript under the static folder, writes copies named
+after a hash of their content, precompresses them (gzip, and brotli when the
+brotli package is installed) and records the mapping in a manifest. Pages link
+to the hashed names, which never change content and so can be cached forever.
+
+Run it at deploy time, before the workers start:
+
+    python assets.py
+
+or set ASSET_BUILD_ON_STARTUP to build when the app is created.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli output is optional
+    brotli = None
+
+ASSET_EXTENSIONS = {'.css', '.js'}
+MANIFEST_NAME = "manifest.json"
+
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+CSS_SPACE_RE = re.compile(r"\s+")
+CSS_PUNCTUATION_RE = re.compile(r"\s*([{};,])\s*")
+
+
+def minify_css(text):
+    text = CSS_COMMENT_RE.sub("", text)
+    text = CSS_SPACE_RE.sub(" ", text)
+    text = CSS_PUNCTUATION_RE.sub(r"\1", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    """Conservative JavaScript minification.
+
+    Strips indentation, blank lines and whole-line // comments, leaving lines
+    inside template literals untouched.
+    """
+    lines = []
+    in_template = False
+    for line in text.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith("//"):
+                lines.append(stripped)
+        # An odd number of unescaped backticks opens or closes a template literal
+        if (line.count("`") - line.count("\\`")) % 2:
+            in_template = not in_template
+    return "\n".join(lines) + "\n"
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _write_atomic(path, data):
+    """Write data to path so that readers never see a partial file"""
+    # Per-process temporary name, since several workers may build at once
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_folder, output_folder):
+    """Build hashed, minified and precompressed assets; return the manifest"""
+    manifest = {}
+    if not os.path.isdir(static_folder):
+        return manifest
+
+    output_folder = os.path.abspath(output_folder)
+    for root, dirs, files in os.walk(static_folder):
+        # Never process our own output
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != output_folder]
+
+        for name in files:
+            base, ext = os.path.splitext(name)
+            if ext not in ASSET_EXTENSIONS or base.endswith(".min"):
+                continue
+
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, 'r', encoding='utf-8') as f:
+                content = MINIFIERS[ext](f.read()).encode('utf-8')
+
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            hashed = f"{os.path.splitext(logical)[0]}.{digest}{ext}"
+            target = os.path.join(output_folder, hashed)
+            manifest[logical] = hashed
+
+            # Same name means same content, so existing output can be kept
+            if os.path.exists(target):
+                continue
+
+            # The compressed copies go first, so an asset that exists is complete
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write_atomic(f"{target}.gz", gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_atomic(f"{target}.br", brotli.compress(content, quality=11))
+            _write_atomic(target, content)
+
+    os.makedirs(output_folder, exist_ok=True)
+    _write_atomic(
+        os.path.join(output_folder, MANIFEST_NAME),
+        json.dumps(manifest, indent=2).encode('utf-8')
+    )
+    return manifest
+
+
+def load_manifest(output_folder):
+    """Read a manifest written by build_assets"""
+    try:
+        with open(os.path.join(output_folder, MANIFEST_NAME), 'r') as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return {}
+
+
+if __name__ == '__main__':
+    from app import app
+    manifest = build_assets(app.static_folder, app.config['ASSET_OUTPUT_FOLDER'])
+    for logical, hashed in sorted(manifest.items()):
+        print(f"{logical} -> {hashed}")
@@ -0,0 +1,73 @@
+"""Retrieval benchmark.
+
+Builds a material index over synthetic documents and measures index build
+time, incremental re-index time after one file changes, and query latency:
+
+    python bench_retrieval.py --chunks 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from material_index import MaterialIndex
+
+
+def write_documents(folder, num_files, chunks_per_file, words_per_chunk, vocabulary, rng):
+    # Zipf-like word frequencies, roughly matching natural text
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    for i in range(num_files):
+        with open(os.path.join(folder, f"notes_{i}.txt"), 'w') as f:
+            for _ in range(chunks_per_file):
+                f.write(" ".join(rng.choices(vocabulary, weights, k=words_per_chunk)))
+                f.write("\n\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=100000)
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--words-per-chunk', type=int, default=150)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(50000)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        upload_folder = os.path.join(tmp, "uploads")
+        os.makedirs(upload_folder)
+        chunks_per_file = max(1, args.chunks // args.files)
+        write_documents(upload_folder, args.files, chunks_per_file, args.words_per_chunk, vocabulary, rng)
+
+        index = MaterialIndex(upload_folder, os.path.join(tmp, "index"))
+        # One word per ~8 characters, so each paragraph becomes one chunk
+        index.chunk_chars = args.words_per_chunk * 4
+
+        started = time.perf_counter()
+        index.refresh()
+        print(f"Full build: {time.perf_counter() - started:.1f}s "
+              f"for {sum(f['chunks'] for f in index.list_files())} chunks")
+
+        with open(os.path.join(upload_folder, "notes_0.txt"), 'a') as f:
+            f.write("an extra paragraph about photosynthesis\n")
+        started = time.perf_counter()
+        changed = index.refresh()
+        print(f"Incremental refresh ({len(changed)} file changed): {time.perf_counter() - started:.1f}s")
+
+        for label, pool in (("rare terms", vocabulary[5000:]), ("mixed terms", vocabulary[:5000])):
+            index.search(" ".join(rng.sample(pool, 3)))  # map the table
+            timings = []
+            for _ in range(args.queries):
+                query = " ".join(rng.sample(pool, 3))
+                started = time.perf_counter()
+                index.search(query, k=3)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            p50 = timings[len(timings) // 2] * 1000
+            p95 = timings[int(len(timings) * 0.95)] * 1000
+            print(f"Query ({label}): p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Startup-time benchmark.
+
+Measures how long a worker takes to become ready and how long the first
+knowledge-base lookup takes, with a synthetic knowledge cache of a given size
+loaded either by parsing the JSON cache or by mapping the warm-start snapshot.
+
+    python bench_startup.py --entries 20000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Runs in a fresh interpreter so module import cost is measured from scratch
+CHILD = """
+import os, sys, time, json
+started = time.perf_counter()
+import app as app_module
+app_ready = time.perf_counter()
+import components
+knowledge_base = components.get_knowledge_base()
+knowledge_base.get_information(sys.argv[1])
+first_lookup = time.perf_counter()
+knowledge_base._cache_set(f"new topic {os.getpid()}", "x" * 2000)
+miss_saved = time.perf_counter()
+print(json.dumps({
+    "import_and_create_app": app_ready - started,
+    "first_lookup": first_lookup - app_ready,
+    "save_new_entry": miss_saved - first_lookup,
+}))
+"""
+
+
+def make_cache(path, entries, value_size):
+    value = "x" * value_size
+    with open(path, 'w') as f:
+        json.dump({f"topic {i}": value for i in range(entries)}, f)
+
+
+def run_child(workdir, env, query):
+    output = subprocess.check_output(
+        [sys.executable, "-c", CHILD, query],
+        cwd=workdir,
+        env=env,
+        stderr=subprocess.DEVNULL
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--value-size', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "knowledge_cache.json")
+        snapshot_file = os.path.join(tmp, "knowledge_cache.snapshot")
+        delta_file = os.path.join(tmp, "knowledge_cache.delta")
+        make_cache(cache_file, args.entries, args.value_size)
+
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": repo_dir,
+            "KNOWLEDGE_CACHE_FILE": cache_file,
+            "KNOWLEDGE_SNAPSHOT_FILE": snapshot_file,
+            "KNOWLEDGE_DELTA_FILE": delta_file,
+        })
+        query = f"topic {args.entries // 2}"
+
+        print(f"{args.entries} cache entries, {os.path.getsize(cache_file) / 1e6:.1f} MB")
+        for mode in ("json", "snapshot"):
+            timings = []
+            for _ in range(args.runs):
+                if mode == "json" and os.path.exists(snapshot_file):
+                    os.remove(snapshot_file)
+                elif mode == "snapshot" and not os.path.exists(snapshot_file):
+                    run_child(tmp, env, query)
+                timings.append(run_child(tmp, env, query))
+
+            for key in ("import_and_create_app", "first_lookup", "save_new_entry"):
+                best = min(t[key] for t in timings) * 1000
+                print(f"{mode:>8} {key:<22} {best:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,12 @@ import json
 import re
 
 class ChatBot:
-    def __init__(self):
-        self.api_manager = APIManager()
+    def __init__(self, api_manager=None, knowledge_base=None, material_index=None):
+        self.api_manager = api_manager or APIManager()
         self.config = Config()
         self.conversation_history = {}
-        self.knowledge_base = KnowledgeBase()
+        self.knowledge_base = knowledge_base or KnowledgeBase(self.api_manager)
+        self.material_index = material_index  # optional uploaded study materials
     
     def get_system_prompt(self):
         """Generate the system prompt for the chatbot"""
@@ -50,10 +51,14 @@ Guidelines:
             recent_msgs = self.conversation_history[session_id][-self.config.CHATBOT_CONTEXT_LENGTH:]
             self.conversation_history[session_id] = [system_msg] + recent_msgs
     
-    def get_response(self, session_id, user_message):
+    def get_response(self, session_id, user_message, materials_owner=None):
         """Get a response from the chatbot"""
+        # Relevant passages from the shared materials or the student's own
+        # uploads take priority over the generic knowledge base answers below
+        passages = self._retrieve_passages(user_message, materials_owner)
+        
         # Check if user is asking for specific information
-        if self._is_information_request(user_message):
+        if not passages and self._is_information_request(user_message):
             topic = self._extract_topic(user_message)
             if topic:
                 # Get information from knowledge base
@@ -65,7 +70,7 @@ Guidelines:
                     return {"response": info}
         
         # Check if user is asking for an explanation
-        if self._is_explanation_request(user_message):
+        if not passages and self._is_explanation_request(user_message):
             concept = self._extract_concept(user_message)
             level = self._extract_level(user_message)
             if concept:
@@ -78,7 +83,7 @@ Guidelines:
                     return {"response": explanation}
         
         # Check if user is asking for study tips
-        if self._is_study_tips_request(user_message):
+        if not passages and self._is_study_tips_request(user_message):
             topic = self._extract_topic(user_message)
             if topic:
                 # Get study tips from knowledge base
@@ -92,10 +97,13 @@ Guidelines:
         # Add user message to conversation
         self.add_message(session_id, "user", user_message)
         
+        # Ground the answer in the retrieved passages without storing them in the history
+        messages = self.conversation_history[session_id]
+        if passages:
+            messages = [messages[0], self._grounding_message(passages)] + messages[1:]
+        
         # Get response from API
-        response = self.api_manager.get_chatbot_response(
-            self.conversation_history[session_id]
-        )
+        response = self.api_manager.get_chatbot_response(messages)
         
         if "error" in response:
             bot_response = f"I'm sorry, I encountered an error: {response['error']}. Please try again later."
@@ -109,6 +117,27 @@ Guidelines:
             "usage": response.get("usage", {})
         }
     
+    def _retrieve_passages(self, message, owner=None):
+        """Find passages from uploaded study materials relevant to the message"""
+        if self.material_index is None:
+            return []
+        return self.material_index.search(
+            message, self.config.RETRIEVAL_TOP_K,
+            owner=owner, min_coverage=self.config.RETRIEVAL_MIN_COVERAGE
+        )
+    
+    def _grounding_message(self, passages):
+        """Build a system message containing the retrieved passages"""
+        sources = "\n\n".join(
+            f"[{i + 1}] ({passage['file']}) {passage['text']}" for i, passage in enumerate(passages)
+        )
+        return {
+            "role": "system",
+            "content": f"""Use the following excerpts from the student's study materials to answer. Prefer them over general knowledge and mention the source number when you use one.
+
+{sources}"""
+        }
+    
     def _is_information_request(self, message):
         """Check if the user is requesting information about a topic"""
         info_patterns = [
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from api_manager import APIManager
+from knowledge_base import KnowledgeBase
+from chatbot import ChatBot
+from test_simulator import TestSimulator
+from question_pool import QuestionPool
+from material_index import MaterialIndex
+from job_queue import JobQueue, QueueFull
+from test_events import TestEventHub
+from analytics import AnalyticsStore
+
+# Components are built on first use and shared by every request in the worker,
+# so importing the app stays cheap and there is exactly one APIManager and one
+# KnowledgeBase per process.
+_instances = {}
+_lock = threading.RLock()
+# Callbacks attached to the TestSimulator when it is built
+_test_listeners = []
+# (pid, monotonic time) of the last material refresh this worker queued
+_material_refresh = (None, 0.0)
+
+
+def _get_or_create(name, factory):
+    """Return the named singleton, building it on first use"""
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+
+def get_api_manager():
+    return _get_or_create("api_manager", APIManager)
+
+
+def get_knowledge_base():
+    return _get_or_create(
+        "knowledge_base",
+        lambda: KnowledgeBase(get_api_manager())
+    )
+
+
+def get_material_index():
+    return _get_or_create("material_index", MaterialIndex)
+
+
+def get_chatbot():
+    return _get_or_create(
+        "chatbot",
+        lambda: ChatBot(get_api_manager(), get_knowledge_base(), get_material_index())
+    )
+
+
+def get_question_pool():
+    return _get_or_create("question_pool", QuestionPool)
+
+
+def add_test_listener(listener):
+    """Register a TestSimulator listener without forcing it to be built"""
+    with _lock:
+        _test_listeners.append(listener)
+        if "test_simulator" in _instances:
+            _instances["test_simulator"].add_listener(listener)
+
+
+def _build_test_simulator():
+    test_simulator = TestSimulator(get_api_manager(), get_question_pool())
+    for listener in _test_listeners:
+        test_simulator.add_listener(listener)
+    return test_simulator
+
+
+def get_test_simulator():
+    return _get_or_create("test_simulator", _build_test_simulator)
+
+
+def get_test_events():
+    return _get_or_create("test_events", lambda: TestEventHub(get_test_simulator()))
+
+
+def get_job_queue():
+    return _get_or_create("job_queue", JobQueue)
+
+
+def get_analytics():
+    return _get_or_create("analytics", AnalyticsStore)
+
+
+def refresh_materials(interval):
+    """Queue a re-index of the upload folder unless this worker did so recently.
+
+    Keyed by pid so that each worker forked from a preloaded parent runs its
+    own refresh rather than relying on threads that did not survive the fork.
+    """
+    global _material_refresh
+    now = time.monotonic()
+    pid, queued_at = _material_refresh
+    if pid == os.getpid() and now - queued_at < interval:
+        return
+    with _lock:
+        pid, queued_at = _material_refresh
+        if pid == os.getpid() and now - queued_at < interval:
+            return
+        try:
+            get_job_queue().submit(get_material_index().refresh, priority="low")
+        except QueueFull:
+            return  # tried again on a later request
+        _material_refresh = (os.getpid(), now)
+
+
+def preload():
+    """Build every component up front"""
+    get_chatbot()
+    get_test_simulator()
+    get_knowledge_base()._ensure_loaded()
+
+
+def reset():
+    """Drop all components so the next access rebuilds them"""
+    global _material_refresh
+    with _lock:
+        _instances.clear()
+        _material_refresh = (None, 0.0)
@@ -17,6 +17,10 @@ class Config:
     GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-pro')
     GEMINI_TEMPERATURE = float(os.environ.get('GEMINI_TEMPERATURE', 0.7))
     GEMINI_MAX_TOKENS = int(os.environ.get('GEMINI_MAX_TOKENS', 1000))
+    # Cheaper, lower-latency model for short requests (see model_router.py)
+    GEMINI_FAST_MODEL = os.environ.get('GEMINI_FAST_MODEL', 'gemini-2.5-flash-lite')
+    # Prompts longer than this (in characters) prefer GEMINI_MODEL
+    GEMINI_LARGE_PROMPT_CHARS = int(os.environ.get('GEMINI_LARGE_PROMPT_CHARS', 12000))
     
     # Chatbot Settings
     CHATBOT_PERSONA = os.environ.get('CHATBOT_PERSONA', 'friendly and knowledgeable tutor')
@@ -24,4 +28,60 @@ class Config:
     
     # Test Settings
     DEFAULT_TEST_DURATION = int(os.environ.get('DEFAULT_TEST_DURATION', 30))  # minutes
-    DEFAULT_QUESTION_COUNT = int(os.environ.get('DEFAULT_QUESTION_COUNT', 10))
\ No newline at end of file
+    DEFAULT_QUESTION_COUNT = int(os.environ.get('DEFAULT_QUESTION_COUNT', 10))
+    # Seconds between time-remaining events pushed to a running test
+    TEST_CHECKPOINT_INTERVAL = int(os.environ.get('TEST_CHECKPOINT_INTERVAL', 60))
+    MAX_CLASS_SIZE = int(os.environ.get('MAX_CLASS_SIZE', 200))
+    # Pre-generated question sets, filled offline by precompute.py
+    QUESTION_POOL_FILE = os.environ.get('QUESTION_POOL_FILE', 'question_pool.json')
+
+    # Background Job Settings
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+    JOB_QUEUE_MAX_DEPTH = int(os.environ.get('JOB_QUEUE_MAX_DEPTH', 50))
+    JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 3600))
+    # Callers sending this token in X-Priority-Token may set a job's priority;
+    # everyone else gets "normal"
+    JOB_PRIORITY_TOKEN = os.environ.get('JOB_PRIORITY_TOKEN')
+    # Server-sent event streams keep a connection, and under the threaded
+    # server or a sync worker a thread, for as long as they are open. Only
+    # enable them when serving with a cooperative worker such as
+    # gunicorn -k gevent; clients poll the status endpoints otherwise.
+    EVENT_STREAMS = os.environ.get('EVENT_STREAMS', 'false').lower() == 'true'
+
+    # Knowledge Base Settings
+    KNOWLEDGE_CACHE_FILE = os.environ.get('KNOWLEDGE_CACHE_FILE', 'knowledge_cache.json')
+    KNOWLEDGE_SNAPSHOT_FILE = os.environ.get('KNOWLEDGE_SNAPSHOT_FILE', 'knowledge_cache.snapshot')
+    # Entries added since the snapshot was written (see KnowledgeBase.compact)
+    KNOWLEDGE_DELTA_FILE = os.environ.get('KNOWLEDGE_DELTA_FILE', 'knowledge_cache.delta')
+
+    # Study Material Settings
+    MATERIAL_INDEX_FOLDER = os.environ.get('MATERIAL_INDEX_FOLDER', 'material_index')
+    MATERIAL_CHUNK_CHARS = int(os.environ.get('MATERIAL_CHUNK_CHARS', 1000))
+    RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', 3))
+    RETRIEVAL_MAX_K = int(os.environ.get('RETRIEVAL_MAX_K', 20))
+    # Share of the query (weighted by idf) a passage must match before the
+    # chatbot grounds its answer in it instead of using the knowledge base
+    RETRIEVAL_MIN_COVERAGE = float(os.environ.get('RETRIEVAL_MIN_COVERAGE', 0.5))
+    # Each worker re-indexes files changed in the upload folder on its first
+    # request and then at most this often (0 disables it)
+    MATERIAL_REFRESH_SECONDS = int(os.environ.get('MATERIAL_REFRESH_SECONDS', 300))
+
+    # Profiling Settings
+    # The profiling endpoint is disabled unless a token is set
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+    PROFILER_MAX_DURATION = int(os.environ.get('PROFILER_MAX_DURATION', 60))  # seconds
+    PROFILER_MAX_RATE = int(os.environ.get('PROFILER_MAX_RATE', 250))  # samples per second
+
+    # Static Asset and Response Settings
+    # Hashed, minified and precompressed copies of the static files
+    ASSET_OUTPUT_FOLDER = os.environ.get('ASSET_OUTPUT_FOLDER', os.path.join('static', 'dist'))
+    # Assets are built at deploy time with python assets.py; building them in
+    # every worker at startup would slow down boot
+    ASSET_BUILD_ON_STARTUP = os.environ.get('ASSET_BUILD_ON_STARTUP', 'false').lower() == 'true'
+    # JSON responses smaller than this are not worth compressing
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 512))
+
+    # Startup Settings
+    # Build all components when the app is created instead of on first use
+    # (useful with a preloading server such as gunicorn --preload)
+    PRELOAD_COMPONENTS = os.environ.get('PRELOAD_COMPONENTS', 'false').lower() == 'true'
\ No newline at end of file
@@ -0,0 +1,25 @@
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, where files are not shared between workers
+    fcntl = None
+
+
+@contextlib.contextmanager
+def file_lock(path, shared=False):
+    """Hold an advisory lock on path for the duration of the with block.
+
+    Used to coordinate the worker processes and batch jobs that share the
+    cache files. The lock file is created if needed and never removed.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
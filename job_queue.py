@@ -0,0 +1,197 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its maximum depth"""
+
+
+# Every JobQueue in the process, so that a forked child can reset them
+_queues = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    for job_queue in list(_queues):
+        job_queue._reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class JobQueue:
+    """Priority queue of background jobs run by a fixed pool of worker threads.
+
+    Jobs are plain callables. Their return value becomes the job result; a
+    dict containing "error" marks the job as failed, matching how the rest of
+    the app reports errors.
+    """
+
+    def __init__(self, workers=None, max_depth=None, retention=None):
+        self.config = Config()
+        self.num_workers = workers or self.config.JOB_WORKERS
+        self.max_depth = max_depth or self.config.JOB_QUEUE_MAX_DEPTH
+        self.retention = retention or self.config.JOB_RETENTION_SECONDS
+        self._sequence = itertools.count()  # keeps equal priorities in FIFO order
+        self._reset()
+        _queues.add(self)
+
+    def _reset(self):
+        """Start with no jobs and no workers.
+
+        Also called in a child process forked from one that used the queue
+        (e.g. gunicorn --preload): the parent's worker threads do not exist
+        in the child and its locks may have been held mid-update, so nothing
+        is carried over and workers are started again on the next submit.
+        """
+        self._queue = queue.PriorityQueue()
+        self._jobs = {}
+        self._changed = threading.Condition()
+        self._workers = []
+        self._running = 0
+        self._rejected = 0
+        # Recent (wait, run) times in seconds, for the stats endpoint
+        self._timings = deque(maxlen=500)
+
+    def _start_workers(self):
+        """Start the worker threads on first use"""
+        if self._workers:
+            return
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, func, *args, priority="normal", **kwargs):
+        """Queue a job and return its id, or raise QueueFull"""
+        with self._changed:
+            self._prune()
+            if self._queue.qsize() >= self.max_depth:
+                self._rejected += 1
+                raise QueueFull(f"Job queue is full ({self.max_depth} jobs waiting)")
+
+            job_id = str(uuid.uuid4())
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",  # queued, running, done, failed
+                "priority": priority,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+            }
+            self._queue.put((
+                PRIORITIES.get(priority, PRIORITIES["normal"]), next(self._sequence),
+                job_id, func, args, kwargs
+            ))
+            self._start_workers()
+        return job_id
+
+    def _work(self):
+        while True:
+            _, _, job_id, func, args, kwargs = self._queue.get()
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                self._running += 1
+                self._changed.notify_all()
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                logger.exception(f"Job {job_id} failed")
+                result = {"error": str(e)}
+
+            with self._changed:
+                job["result"] = result
+                job["status"] = "failed" if isinstance(result, dict) and "error" in result else "done"
+                job["finished_at"] = time.time()
+                self._running -= 1
+                self._timings.append((
+                    job["started_at"] - job["submitted_at"],
+                    job["finished_at"] - job["started_at"]
+                ))
+                self._changed.notify_all()
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        for job_id in [j["id"] for j in self._jobs.values()
+                       if j["finished_at"] and j["finished_at"] < cutoff]:
+            del self._jobs[job_id]
+
+    def _describe(self, job):
+        now = time.time()
+        started = job["started_at"]
+        finished = job["finished_at"]
+        description = {
+            "job_id": job["id"],
+            "status": job["status"],
+            "wait_time": round((started or now) - job["submitted_at"], 3),
+        }
+        if started:
+            description["run_time"] = round((finished or now) - started, 3)
+        if job["status"] in ("done", "failed"):
+            description["result"] = job["result"]
+        return description
+
+    def get(self, job_id):
+        """Return the status of a job, or None if it is unknown"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return self._describe(job) if job else None
+
+    def wait(self, job_id, last_status=None, timeout=None):
+        """Block until the job's status differs from last_status, then return it"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] != last_status:
+                    return self._describe(job) if job else None
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return self._describe(job)
+                self._changed.wait(remaining)
+
+    def stats(self):
+        """Queue depth, worker usage and recent wait/run times"""
+        with self._changed:
+            timings = list(self._timings)
+            running = self._running
+            rejected = self._rejected
+
+        def summary(values):
+            if not values:
+                return {"avg": 0, "p95": 0, "max": 0}
+            values = sorted(values)
+            return {
+                "avg": round(sum(values) / len(values), 3),
+                "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+                "max": round(values[-1], 3),
+            }
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "running": running,
+            "workers": self.num_workers,
+            "rejected": rejected,
+            "wait_time": summary([w for w, _ in timings]),
+            "run_time": summary([r for _, r in timings]),
+        }
@@ -1,12 +1,82 @@
 import json
 import os
+import threading
 from api_manager import APIManager
+from config import Config
+from file_lock import file_lock
+from mmap_table import MmapTable
 
 class KnowledgeBase:
-    def __init__(self):
-        self.api_manager = APIManager()
-        self.cache_file = "knowledge_cache.json"
-        self.knowledge_cache = self._load_cache()
+    def __init__(self, api_manager=None):
+        self.api_manager = api_manager or APIManager()
+        self.config = Config()
+        self.cache_file = self.config.KNOWLEDGE_CACHE_FILE
+        self.snapshot_file = self.config.KNOWLEDGE_SNAPSHOT_FILE
+        self.delta_file = self.config.KNOWLEDGE_DELTA_FILE
+        self.lock_file = f"{self.cache_file}.lock"
+        self._lock = threading.RLock()
+        # The cache is loaded on first use so that constructing a KnowledgeBase
+        # (and therefore importing the app) never parses the cache file.
+        # Entries live in a memory-mapped snapshot. Entries added since the
+        # snapshot was written are appended to the delta file, one JSON line
+        # each, and kept in knowledge_cache until compact() folds them in.
+        self._loaded = False
+        self._snapshot = None
+        self._snapshot_id = None  # identifies the snapshot file that is open
+        self._delta_offset = 0  # bytes of the delta file already read
+        self.knowledge_cache = {}
+        # Set for lookups that must not touch the files, such as a dry run
+        # of precompute.py: nothing is built, compacted or locked
+        self.read_only = False
+    
+    def _ensure_loaded(self):
+        """Open the snapshot and read the delta, or rebuild the snapshot"""
+        if self._loaded:
+            return
+        
+        with self._lock:
+            if self._loaded:
+                return
+            
+            self._snapshot = self._open_snapshot()
+            self._snapshot_id = self._file_id(self.snapshot_file)
+            if self._snapshot is None and self.read_only:
+                self.knowledge_cache = self._load_cache()
+            elif self._snapshot is None:
+                # First start, or the cache file was replaced: build a
+                # snapshot so the next worker can skip the parse. Workers
+                # that waited for the lock use the one just built.
+                with file_lock(self.lock_file):
+                    self._snapshot = self._open_snapshot()
+                    self._snapshot_id = self._file_id(self.snapshot_file)
+                    if self._snapshot is None:
+                        self._compact_locked()
+                        return
+            self._read_delta()
+            self._loaded = True
+    
+    @staticmethod
+    def _file_id(path):
+        """Changes whenever the file at path is replaced"""
+        try:
+            stat = os.stat(path)
+            return (stat.st_ino, stat.st_mtime_ns)
+        except OSError:
+            return None
+    
+    def _open_snapshot(self):
+        """Open the snapshot if it is at least as new as the cache file"""
+        if not os.path.exists(self.snapshot_file):
+            return None
+        
+        if os.path.exists(self.cache_file) and \
+                os.path.getmtime(self.snapshot_file) < os.path.getmtime(self.cache_file):
+            return None
+        
+        try:
+            return MmapTable(self.snapshot_file)
+        except (ValueError, IOError):
+            return None
     
     def _load_cache(self):
         """Load knowledge cache from file"""
@@ -18,42 +88,182 @@ class KnowledgeBase:
                 return {}
         return {}
     
-    def _save_cache(self):
-        """Save knowledge cache to file"""
+    def _parse_delta(self, offset):
+        """Entries in the delta file after offset, and the offset they end at"""
+        entries = {}
+        try:
+            with open(self.delta_file, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except IOError:
+            return entries, offset
+        
+        # Only whole lines; a partly written one is picked up next time
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                key, value = json.loads(line)
+            except (ValueError, TypeError):
+                continue
+            entries[key] = value
+        return entries, offset + end
+    
+    def _read_delta(self):
+        """Add entries appended to the delta file since it was last read"""
+        entries, self._delta_offset = self._parse_delta(self._delta_offset)
+        self.knowledge_cache.update(entries)
+    
+    def _append_delta(self, cache_key, value):
+        """Persist one entry by appending it to the delta file"""
+        line = json.dumps([cache_key, value]) + "\n"
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.knowledge_cache, f)
+            with file_lock(self.lock_file):
+                with open(self.delta_file, 'a') as f:
+                    f.write(line)
         except IOError:
             pass
     
-    def get_information(self, query):
-        """Get information about a topic"""
-        # Check cache first
-        cache_key = query.lower().strip()
+    def _write_cache_file(self, entries):
+        """Write entries, whose values are already JSON, as the cache file"""
+        tmp_path = f"{self.cache_file}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"{")
+            for i, (key, value) in enumerate(sorted(entries.items())):
+                if i:
+                    f.write(b", ")
+                f.write(json.dumps(key.decode('utf-8')).encode('utf-8'))
+                f.write(b": ")
+                f.write(value)
+            f.write(b"}")
+        os.replace(tmp_path, self.cache_file)
+    
+    def compact(self):
+        """Fold the delta file into a new snapshot and cache file.
+        
+        This rewrites every entry, so it belongs in batch jobs and deploys
+        (python knowledge_base.py), not on the request path.
+        """
+        with self._lock, file_lock(self.lock_file):
+            self._compact_locked()
+    
+    def _compact_locked(self):
+        """compact(), for callers already holding both locks"""
+        # Start from what is on disk rather than this process's view of
+        # it, so entries written by other processes are kept
+        snapshot = self._open_snapshot()
+        if snapshot is not None:
+            entries = dict(snapshot.items())
+        else:
+            entries = {
+                key.encode('utf-8'): json.dumps(value).encode('utf-8')
+                for key, value in self._load_cache().items()
+            }
+        
+        delta, _ = self._parse_delta(0)
+        for key, value in delta.items():
+            entries[key.encode('utf-8')] = json.dumps(value).encode('utf-8')
+        
+        try:
+            # Cache file first, so the snapshot is never the older of the two
+            self._write_cache_file(entries)
+            MmapTable.write(self.snapshot_file, entries.items())
+            open(self.delta_file, 'w').close()
+            self._snapshot = MmapTable(self.snapshot_file)
+            self._snapshot_id = self._file_id(self.snapshot_file)
+            self.knowledge_cache = {}
+            self._delta_offset = 0
+        except (ValueError, IOError):
+            # Keep serving everything that was read
+            self._snapshot = None
+            self.knowledge_cache = {
+                key.decode('utf-8'): json.loads(value) for key, value in entries.items()
+            }
+        self._loaded = True
+    
+    def _refresh(self):
+        """Catch up with entries written by other processes.
+        
+        A new snapshot file means another process compacted the cache, so it
+        is reopened and the delta read from the start; otherwise only lines
+        appended since the last read are parsed.
+        """
+        if self.read_only:
+            return
+        
+        with self._lock, file_lock(self.lock_file, shared=True):
+            snapshot_id = self._file_id(self.snapshot_file)
+            if snapshot_id != self._snapshot_id:
+                snapshot = self._open_snapshot()
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    self._snapshot_id = snapshot_id
+                    self.knowledge_cache = {}
+                    self._delta_offset = 0
+            
+            try:
+                if os.path.getsize(self.delta_file) < self._delta_offset:
+                    self._delta_offset = 0
+            except OSError:
+                return
+            self._read_delta()
+    
+    def _lookup(self, cache_key):
         if cache_key in self.knowledge_cache:
             return self.knowledge_cache[cache_key]
         
-        # Generate information using API
+        snapshot = self._snapshot
+        if snapshot is not None:
+            value = snapshot.get(cache_key)
+            if value is not None:
+                return json.loads(value)
+        return None
+    
+    def _cache_get(self, cache_key):
+        """Look up a cache entry, returning None on a miss"""
+        self._ensure_loaded()
+        
+        value = self._lookup(cache_key)
+        if value is None:
+            # A precompute run or another worker may have added it since
+            self._refresh()
+            value = self._lookup(cache_key)
+        return value
+    
+    def _cache_set(self, cache_key, value):
+        """Add a cache entry and persist it"""
+        self._ensure_loaded()
+        
+        with self._lock:
+            self.knowledge_cache[cache_key] = value
+        self._append_delta(cache_key, value)
+    
+    def is_cached(self, cache_key):
+        """Check whether a cache entry exists without generating it"""
+        return self._cache_get(cache_key) is not None
+    
+    @staticmethod
+    def information_key(query):
+        return query.lower().strip()
+    
+    @staticmethod
+    def explanation_key(concept, level):
+        return f"explain:{level}:{concept.lower().strip()}"
+    
+    @staticmethod
+    def study_tips_key(topic):
+        return f"study_tips:{topic.lower().strip()}"
+    
+    def information_messages(self, query):
+        """Build the prompt messages for get_information"""
         prompt = f"Provide comprehensive information about {query}. Include key concepts, examples, and important details."
         
-        messages = [
+        return [
             {"role": "system", "content": "You are a knowledgeable AI assistant that provides accurate and comprehensive information on various topics."},
             {"role": "user", "content": prompt}
         ]
-        
-        response = self.api_manager.get_chatbot_response(messages)
-        
-        if "error" in response:
-            return {"error": response["error"]}
-        
-        # Cache the response
-        self.knowledge_cache[cache_key] = response["content"]
-        self._save_cache()
-        
-        return response["content"]
     
-    def explain_concept(self, concept, level="beginner"):
-        """Explain a concept at a specific level"""
+    def explanation_messages(self, concept, level="beginner"):
+        """Build the prompt messages for explain_concept"""
         level_instructions = {
             "beginner": "Explain this concept as if to someone with no prior knowledge. Use simple language and relatable examples.",
             "intermediate": "Explain this concept for someone with some basic knowledge. Use appropriate terminology but still be clear.",
@@ -62,30 +272,64 @@ class KnowledgeBase:
         
         prompt = f"{level_instructions.get(level, level_instructions['beginner'])}\n\nExplain: {concept}"
         
-        messages = [
+        return [
             {"role": "system", "content": "You are an AI assistant that explains concepts clearly at different levels of understanding."},
             {"role": "user", "content": prompt}
         ]
-        
-        response = self.api_manager.get_chatbot_response(messages)
-        
-        if "error" in response:
-            return {"error": response["error"]}
-        
-        return response["content"]
     
-    def get_study_tips(self, topic):
-        """Get study tips for a specific topic"""
+    def study_tips_messages(self, topic):
+        """Build the prompt messages for get_study_tips"""
         prompt = f"Provide effective study tips and strategies for learning about {topic}. Include techniques for understanding, memorizing, and applying the knowledge."
         
-        messages = [
+        return [
             {"role": "system", "content": "You are an AI assistant that provides effective study tips and learning strategies."},
             {"role": "user", "content": prompt}
         ]
+    
+    def _cached_response(self, cache_key, messages, call_site):
+        """Return the cached answer for cache_key, generating it on a miss"""
+        # Check cache first
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
         
-        response = self.api_manager.get_chatbot_response(messages)
+        # Generate using API
+        response = self.api_manager.get_chatbot_response(messages, call_site)
         
         if "error" in response:
             return {"error": response["error"]}
         
-        return response["content"]
\ No newline at end of file
+        # Cache the response
+        self._cache_set(cache_key, response["content"])
+        
+        return response["content"]
+    
+    def get_information(self, query):
+        """Get information about a topic"""
+        return self._cached_response(
+            self.information_key(query),
+            self.information_messages(query),
+            "information"
+        )
+    
+    def explain_concept(self, concept, level="beginner"):
+        """Explain a concept at a specific level"""
+        return self._cached_response(
+            self.explanation_key(concept, level),
+            self.explanation_messages(concept, level),
+            f"explanation:{level}"
+        )
+    
+    def get_study_tips(self, topic):
+        """Get study tips for a specific topic"""
+        return self._cached_response(
+            self.study_tips_key(topic),
+            self.study_tips_messages(topic),
+            "study_tips"
+        )
+
+if __name__ == '__main__':
+    # Fold new entries into the warm-start snapshot, e.g. at deploy time
+    knowledge_base = KnowledgeBase()
+    knowledge_base.compact()
+    print(f"Wrote {len(knowledge_base._snapshot or [])} entries to {knowledge_base.snapshot_file}")
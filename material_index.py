@@ -0,0 +1,398 @@
+import heapq
+import json
+import math
+import os
+import re
+import struct
+import threading
+import uuid
+from array import array
+from config import Config
+from file_lock import file_lock
+from mmap_table import MmapTable
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF support is optional
+    PdfReader = None
+
+TEXT_EXTENSIONS = {'.txt', '.md', '.markdown'}
+PDF_EXTENSIONS = {'.pdf'}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about an and are as at be but by can do does for from has have how in is it
+its me my of on or please that the this to was were what when where which who
+why will with you your
+""".split())
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Keys inside the index table. Terms never start with these bytes.
+META_KEY = b"\x00meta"
+DOCLENS_KEY = b"\x00doclens"
+CHUNK_PREFIX = b"\x01"
+CHUNK_ID = struct.Struct(">I")  # big-endian so chunk keys sort by id
+
+
+def tokenize(text):
+    """Split text into lowercase index terms"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def split_key(key):
+    """Split a manifest key into (owner, filename); shared files have no owner"""
+    owner, _, filename = key.rpartition("/")
+    return owner or None, filename
+
+
+def allowed_file(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return ext in TEXT_EXTENSIONS or (ext in PDF_EXTENSIONS and PdfReader is not None)
+
+
+def read_lines(path):
+    """Yield the text of a file line by line without reading it all at once"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PDF_EXTENSIONS:
+        if PdfReader is None:
+            raise ValueError("PDF support requires the pypdf package")
+        # Pages are extracted one at a time
+        for page in PdfReader(path).pages:
+            yield from (page.extract_text() or "").splitlines()
+            yield ""
+    else:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+
+def iter_chunks(lines, chunk_chars):
+    """Group lines into passages of roughly chunk_chars characters.
+
+    Passages end at paragraph breaks where possible; very long paragraphs are
+    cut at word boundaries.
+    """
+    buffer = []
+    size = 0
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if size >= chunk_chars:
+                yield " ".join(buffer)
+                buffer, size = [], 0
+            continue
+
+        for word in line.split():
+            buffer.append(word)
+            size += len(word) + 1
+            if size >= chunk_chars * 2:
+                yield " ".join(buffer)
+                buffer, size = [], 0
+
+    if buffer:
+        yield " ".join(buffer)
+
+
+class Segment:
+    """One file's memory-mapped segment table and its statistics"""
+
+    __slots__ = ("name", "owner", "table", "doclens", "chunks", "length")
+
+    def __init__(self, name, owner, table):
+        self.name = name
+        self.owner = owner
+        self.table = table
+        self.doclens = array('I')
+        self.doclens.frombytes(table.get(DOCLENS_KEY, b""))
+        meta = json.loads(table.get(META_KEY))
+        self.chunks = meta["chunks"]
+        self.length = meta["length"]
+
+
+class MaterialIndex:
+    """BM25 index over the study materials in the upload folder.
+
+    Each uploaded file is indexed into its own memory-mapped segment table
+    holding the file's postings, chunk lengths and passage text. Adding or
+    changing a file only writes that file's segment and updates the manifest;
+    queries combine the statistics of all segments, so the index is never
+    rebuilt as a whole.
+
+    Files uploaded by a user are stored under a folder named after their
+    owner id and are only searched for that owner. Files placed directly in
+    the upload folder form the shared corpus that every search includes.
+    Manifest keys are "owner/filename" or just "filename" for shared files.
+    """
+
+    def __init__(self, upload_folder=None, index_folder=None):
+        self.config = Config()
+        self.upload_folder = upload_folder or self.config.UPLOAD_FOLDER
+        self.index_folder = index_folder or self.config.MATERIAL_INDEX_FOLDER
+        self.segment_folder = os.path.join(self.index_folder, "segments")
+        self.manifest_file = os.path.join(self.index_folder, "manifest.json")
+        self.lock_file = os.path.join(self.index_folder, "manifest.lock")
+        self.chunk_chars = self.config.MATERIAL_CHUNK_CHARS
+
+        self._manifest_lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._manifest_id = None
+        # Open segments as of _manifest_id
+        self._segments = []
+
+    # --- Ingestion ---
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError):
+                pass
+        return {}
+
+    def _save_manifest(self, manifest):
+        tmp_path = f"{self.manifest_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_file)
+
+    def _update_manifest(self, changes):
+        """Apply {filename: entry, or None to remove it} and delete replaced segments"""
+        replaced = []
+        # Workers in other processes ingest into the same index
+        with self._manifest_lock, file_lock(self.lock_file):
+            manifest = self._load_manifest()
+            for filename, entry in changes.items():
+                old = manifest.pop(filename, None)
+                if old:
+                    replaced.append(old["segment"])
+                if entry:
+                    manifest[filename] = entry
+            self._save_manifest(manifest)
+
+        # Readers that still have a replaced segment mapped keep their mapping
+        for segment in replaced:
+            try:
+                os.remove(os.path.join(self.segment_folder, segment))
+            except OSError:
+                pass
+
+    def path(self, filename, owner=None):
+        """Where an uploaded file is stored"""
+        if owner:
+            return os.path.join(self.upload_folder, owner, filename)
+        return os.path.join(self.upload_folder, filename)
+
+    def _build_segment(self, key):
+        """Index one file into a new segment table, returning its manifest entry"""
+        owner, filename = split_key(key)
+        path = self.path(filename, owner)
+        stat = os.stat(path)
+
+        postings = {}
+        doclens = array('I')
+        chunk_items = []
+        for text in iter_chunks(read_lines(path), self.chunk_chars):
+            counts = {}
+            for term in tokenize(text):
+                counts[term] = counts.get(term, 0) + 1
+            if not counts:
+                continue
+
+            chunk_id = len(doclens)
+            for term, count in counts.items():
+                ids_tfs = postings.get(term)
+                if ids_tfs is None:
+                    ids_tfs = postings[term] = (array('I'), array('H'))
+                ids_tfs[0].append(chunk_id)
+                ids_tfs[1].append(min(count, 0xFFFF))
+            doclens.append(sum(counts.values()))
+            chunk_items.append((
+                CHUNK_PREFIX + CHUNK_ID.pack(chunk_id),
+                json.dumps({"file": filename, "text": text}).encode('utf-8')
+            ))
+
+        meta = {"chunks": len(doclens), "length": sum(doclens)}
+
+        def items():
+            yield META_KEY, json.dumps(meta).encode('utf-8')
+            yield DOCLENS_KEY, doclens.tobytes()
+            for term, (ids, tfs) in postings.items():
+                yield term, ids.tobytes() + tfs.tobytes()
+            yield from chunk_items
+
+        segment = f"{uuid.uuid4().hex}.table"
+        MmapTable.write(os.path.join(self.segment_folder, segment), items())
+        return {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "segment": segment,
+            "owner": owner,
+            "chunks": meta["chunks"],
+        }
+
+    def ingest(self, filename, owner=None):
+        """Index (or re-index) one uploaded file, stored at path(filename, owner).
+
+        Slow for large files, so the upload route runs it on the job queue.
+        Raises ValueError or IOError if the file cannot be read.
+        """
+        os.makedirs(self.segment_folder, exist_ok=True)
+        key = f"{owner}/{filename}" if owner else filename
+        entry = self._build_segment(key)
+        self._update_manifest({key: entry})
+        return {"filename": filename, "chunks": entry["chunks"]}
+
+    def _scan(self):
+        """Return {manifest key: (mtime, size)} for indexable files in the upload folder"""
+        files = {}
+        if not os.path.isdir(self.upload_folder):
+            return files
+
+        for entry in os.scandir(self.upload_folder):
+            if entry.is_file() and allowed_file(entry.name):
+                stat = entry.stat()
+                files[entry.name] = (stat.st_mtime, stat.st_size)
+            elif entry.is_dir():
+                # One folder per owner
+                for owned in os.scandir(entry.path):
+                    if owned.is_file() and allowed_file(owned.name):
+                        stat = owned.stat()
+                        files[f"{entry.name}/{owned.name}"] = (stat.st_mtime, stat.st_size)
+        return files
+
+    def refresh(self):
+        """Index new and changed files and drop deleted ones.
+
+        Returns the list of files that were (re-)indexed.
+        """
+        os.makedirs(self.segment_folder, exist_ok=True)
+        manifest = self._load_manifest()
+        files = self._scan()
+        changes = {key: None for key in manifest if key not in files}
+        changed = []
+
+        for key, (mtime, size) in files.items():
+            entry = manifest.get(key)
+            if entry and entry["mtime"] == mtime and entry["size"] == size:
+                continue
+            try:
+                changes[key] = self._build_segment(key)
+            except (ValueError, IOError):
+                continue
+            changed.append(key)
+
+        if changes:
+            self._update_manifest(changes)
+        return changed
+
+    def list_files(self, owner=None):
+        """Return the shared files and owner's files with their chunk counts"""
+        files = []
+        for key, entry in sorted(self._load_manifest().items()):
+            file_owner, filename = split_key(key)
+            if file_owner is None or file_owner == owner:
+                files.append({"filename": filename, "chunks": entry["chunks"], "shared": file_owner is None})
+        return files
+
+    # --- Queries ---
+
+    def _open(self):
+        """Return the open segments, reopening them on a new manifest"""
+        try:
+            stat = os.stat(self.manifest_file)
+        except OSError:
+            return self._segments
+        manifest_id = (stat.st_ino, stat.st_mtime_ns)
+
+        if manifest_id != self._manifest_id:
+            with self._open_lock:
+                if manifest_id != self._manifest_id:
+                    # Segments that are still listed stay mapped
+                    previous = {segment.name: segment for segment in self._segments}
+                    segments = []
+                    for entry in self._load_manifest().values():
+                        segment = previous.get(entry["segment"])
+                        if segment is None:
+                            try:
+                                segment = Segment(
+                                    entry["segment"],
+                                    entry.get("owner"),
+                                    MmapTable(os.path.join(self.segment_folder, entry["segment"]))
+                                )
+                            except (ValueError, IOError):
+                                # Replaced while the manifest was being read
+                                continue
+                        segments.append(segment)
+
+                    self._segments = segments
+                    self._manifest_id = manifest_id
+        return self._segments
+
+    def search(self, query, k=3, owner=None, min_coverage=0.0):
+        """Return the top-k passages for query as dicts with file, text and score.
+
+        Only the shared files and owner's files are searched. A passage must
+        match at least min_coverage of the query, weighting each query term
+        by its idf, so that one common word ("explain") cannot make an
+        unrelated passage relevant.
+        """
+        segments = [
+            segment for segment in self._open()
+            if segment.owner is None or segment.owner == owner
+        ]
+        total = sum(segment.chunks for segment in segments)
+        if not total:
+            return []
+        avgdl = sum(segment.length for segment in segments) / total or 1.0
+
+        # Document frequencies are summed over segments so scores match a
+        # single index over the searched files
+        terms = []
+        query_idf = 0.0
+        for term in set(tokenize(query)):
+            postings = []
+            df = 0
+            for segment in segments:
+                data = segment.table.get(term)
+                if data is not None:
+                    postings.append((segment, data))
+                    df += len(data) // 6
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            query_idf += idf
+            if df:
+                terms.append((idf, postings))
+
+        norm = K1 * (1 - B)
+        scale = K1 * B / avgdl
+        scores = {}
+        matched = {}  # idf of the query terms each passage contains
+        for idf, postings in terms:
+            for segment, data in postings:
+                n = len(data) // 6
+                ids = array('I')
+                ids.frombytes(data[:4 * n])
+                tfs = array('H')
+                tfs.frombytes(data[4 * n:])
+
+                doclens = segment.doclens
+                for chunk_id, tf in zip(ids, tfs):
+                    score = idf * tf * (K1 + 1) / (tf + norm + scale * doclens[chunk_id])
+                    key = (segment, chunk_id)
+                    scores[key] = scores.get(key, 0.0) + score
+                    matched[key] = matched.get(key, 0.0) + idf
+
+        if min_coverage > 0:
+            threshold = min_coverage * query_idf - 1e-9
+            scores = {key: score for key, score in scores.items() if matched[key] >= threshold}
+
+        results = []
+        for (segment, chunk_id), score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            chunk = json.loads(segment.table.get(CHUNK_PREFIX + CHUNK_ID.pack(chunk_id)))
+            chunk["score"] = round(score, 4)
+            results.append(chunk)
+        return results
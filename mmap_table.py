@@ -0,0 +1,119 @@
+import bisect
+import mmap
+import os
+import struct
+
+# File layout:
+#   header  : magic (8 bytes) + entry count (uint32)
+#   index   : one (key_offset, key_len, value_offset, value_len) record per entry,
+#             sorted by key so lookups can binary search without loading anything
+#   data    : the raw key and value bytes
+MAGIC = b"SBTABLE1"
+HEADER = struct.Struct("<8sI")
+RECORD = struct.Struct("<QIQI")
+# Every SAMPLE_EVERY-th key is kept in memory to narrow the binary search
+SAMPLE_EVERY = 32
+
+
+class MmapTable:
+    """Read-only, memory-mapped table of sorted byte keys to byte values.
+
+    Opening a table costs one mmap call regardless of its size; pages are only
+    faulted in for the keys that are actually looked up. The first lookup
+    reads a sparse sample of the keys, so later lookups only probe a few
+    records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"{path} is not a valid table")
+
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a valid table")
+        self._sample = None
+
+    @staticmethod
+    def write(path, items):
+        """Write an iterable of (key, value) pairs to path atomically"""
+        entries = sorted(
+            (k if isinstance(k, bytes) else k.encode('utf-8'), v) for k, v in items
+        )
+
+        data_start = HEADER.size + RECORD.size * len(entries)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(entries)))
+
+            offset = data_start
+            for key, value in entries:
+                f.write(RECORD.pack(offset, len(key), offset + len(key), len(value)))
+                offset += len(key) + len(value)
+
+            for key, value in entries:
+                f.write(key)
+                f.write(value)
+
+        os.replace(tmp_path, path)
+
+    def _record(self, i):
+        return RECORD.unpack_from(self._map, HEADER.size + RECORD.size * i)
+
+    def _key(self, i):
+        key_offset, key_len, _, _ = self._record(i)
+        return self._map[key_offset:key_offset + key_len]
+
+    def get(self, key, default=None):
+        """Look up a key, returning its value bytes or default"""
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+
+        sample = self._sample
+        if sample is None:
+            sample = self._sample = [self._key(i) for i in range(0, self.count, SAMPLE_EVERY)]
+
+        # The key can only be in the block after the last sampled key below it
+        block = bisect.bisect_left(sample, key)
+        if block < len(sample) and sample[block] == key:
+            lo = hi = block * SAMPLE_EVERY
+        else:
+            lo = max(block - 1, 0) * SAMPLE_EVERY
+            hi = min(block * SAMPLE_EVERY, self.count)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < self.count:
+            key_offset, key_len, value_offset, value_len = self._record(lo)
+            if self._map[key_offset:key_offset + key_len] == key:
+                return self._map[value_offset:value_offset + value_len]
+        return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return self.count
+
+    def items(self):
+        """Iterate over all (key, value) pairs in key order"""
+        for i in range(self.count):
+            key_offset, key_len, value_offset, value_len = self._record(i)
+            yield (
+                self._map[key_offset:key_offset + key_len],
+                self._map[value_offset:value_offset + value_len],
+            )
+
+    def close(self):
+        self._map.close()
+        self._file.close()
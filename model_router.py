@@ -0,0 +1,184 @@
+import threading
+import time
+from config import Config
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.2
+# A model whose recent error rate is above this is skipped for a while
+ERROR_RATE_LIMIT = 0.5
+MIN_SAMPLES = 5
+COOLDOWN_SECONDS = 30
+# Latency observations lose half their weight after this many seconds
+LATENCY_HALF_LIFE = 60
+# A model moved down for being slow is still tried first this often, so that
+# its latency is measured again
+PROBE_SECONDS = 60
+
+
+class ModelStats:
+    """Moving average of the error rate of one model, across all call sites"""
+
+    def __init__(self):
+        self.error_rate = 0.0
+        self.samples = 0
+        self.last_failure = 0.0
+
+    def record(self, ok):
+        if not ok:
+            self.last_failure = time.monotonic()
+        self.error_rate = EWMA_ALPHA * (0.0 if ok else 1.0) + (1 - EWMA_ALPHA) * self.error_rate
+        self.samples += 1
+
+    def unhealthy(self):
+        return (
+            self.samples >= MIN_SAMPLES
+            and self.error_rate > ERROR_RATE_LIMIT
+            and time.monotonic() - self.last_failure < COOLDOWN_SECONDS
+        )
+
+
+class LatencyStats:
+    """Moving average of the latency of one model on one workload.
+
+    Old observations lose weight with time as well as with each new one, so
+    a model that was slow and is measured again after a quiet spell is
+    judged mostly on the new call.
+    """
+
+    def __init__(self):
+        self.average = 0.0
+        self.samples = 0
+        self.last_sample = 0.0
+        self.last_probe = 0.0
+
+    def record(self, latency):
+        now = time.monotonic()
+        if self.samples:
+            alpha = max(EWMA_ALPHA, 1 - 0.5 ** ((now - self.last_sample) / LATENCY_HALF_LIFE))
+            self.average = alpha * latency + (1 - alpha) * self.average
+        else:
+            self.average = latency
+        self.samples += 1
+        self.last_sample = now
+
+    def over_budget(self, budget):
+        return self.samples >= MIN_SAMPLES and self.average > budget
+
+    def probe_due(self):
+        """True at most once every PROBE_SECONDS while no calls are recorded"""
+        now = time.monotonic()
+        if now - max(self.last_sample, self.last_probe) < PROBE_SECONDS:
+            return False
+        self.last_probe = now
+        return True
+
+
+class ModelRouter:
+    """Chooses the model and generation limits for each kind of API call.
+
+    Every call site has a route listing model tiers in order of preference
+    ("fast" or "default"), a max_tokens limit, a request timeout and a latency
+    budget. Large prompts prefer the default model. A model that has been
+    failing recently is tried last. If the preferred model is slower than the
+    route's budget over at least MIN_SAMPLES calls, the fastest healthy one
+    goes first, except for one call every PROBE_SECONDS that re-measures it.
+    The remaining models are fallbacks for when a call fails.
+
+    Error rates are tracked per model, since an outage affects every call.
+    Latency is tracked per model and workload (call site, and whether the
+    prompt is large), since a model that is slow at generating tests can
+    still be quick at short explanations.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or Config()
+        self.tiers = {
+            "fast": self.config.GEMINI_FAST_MODEL,
+            "default": self.config.GEMINI_MODEL,
+        }
+        max_tokens = self.config.GEMINI_MAX_TOKENS
+        self.routes = {
+            "chat": {"models": ["fast", "default"], "max_tokens": max_tokens, "timeout": 30, "latency_budget": 5},
+            "information": {"models": ["fast", "default"], "max_tokens": max_tokens, "timeout": 30, "latency_budget": 8},
+            "explanation:beginner": {"models": ["fast", "default"], "max_tokens": 800, "timeout": 30, "latency_budget": 8},
+            "explanation:intermediate": {"models": ["fast", "default"], "max_tokens": max_tokens, "timeout": 30, "latency_budget": 8},
+            "explanation:advanced": {"models": ["default", "fast"], "max_tokens": 1500, "timeout": 45, "latency_budget": 15},
+            "study_tips": {"models": ["fast", "default"], "max_tokens": 800, "timeout": 30, "latency_budget": 8},
+            "test_generation": {"models": ["default", "fast"], "max_tokens": 3000, "timeout": 60, "latency_budget": 30},
+        }
+        self._stats = {}
+        self._latency = {}  # (model, workload) -> LatencyStats
+        self._lock = threading.Lock()
+
+    def route(self, call_site):
+        """Return the route for a call site, falling back to the chat route"""
+        return self.routes.get(call_site, self.routes["chat"])
+
+    def _model_stats(self, model):
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = ModelStats()
+        return stats
+
+    def _workload(self, call_site, prompt_chars):
+        """Key under which a call's latency is tracked"""
+        if prompt_chars > self.config.GEMINI_LARGE_PROMPT_CHARS:
+            return f"{call_site}:large"
+        return call_site
+
+    def candidates(self, call_site, prompt_chars=0):
+        """Return the models to try for a call, best first"""
+        route = self.route(call_site)
+        workload = self._workload(call_site, prompt_chars)
+        tiers = list(route["models"])
+        if workload.endswith(":large") and "default" in tiers:
+            tiers.remove("default")
+            tiers.insert(0, "default")
+
+        models = []
+        for tier in tiers:
+            model = self.tiers[tier]
+            if model not in models:
+                models.append(model)
+
+        with self._lock:
+            healthy = [m for m in models if not self._model_stats(m).unhealthy()]
+            ordered = healthy + [m for m in models if m not in healthy]
+
+            preferred = self._latency.get((healthy[0], workload)) if healthy else None
+            if len(healthy) > 1 and preferred is not None and \
+                    preferred.over_budget(route["latency_budget"]) and not preferred.probe_due():
+                latency = lambda m: self._latency[(m, workload)].average if (m, workload) in self._latency else 0.0
+                fastest = min(healthy, key=latency)
+                ordered.remove(fastest)
+                ordered.insert(0, fastest)
+
+        return ordered
+
+    def record(self, model, latency, ok, call_site="chat", prompt_chars=0):
+        """Record the outcome of a call to model"""
+        with self._lock:
+            self._model_stats(model).record(ok)
+            if ok:
+                key = (model, self._workload(call_site, prompt_chars))
+                stats = self._latency.get(key)
+                if stats is None:
+                    stats = self._latency[key] = LatencyStats()
+                stats.record(latency)
+
+    def stats(self):
+        """Per-model error rate, and latency per workload"""
+        with self._lock:
+            return {
+                model: {
+                    "latency": {
+                        workload: round(latency.average, 3)
+                        for (m, workload), latency in sorted(self._latency.items())
+                        if m == model
+                    },
+                    "error_rate": round(s.error_rate, 3),
+                    "samples": s.samples,
+                    "healthy": not s.unhealthy(),
+                }
+                for model, s in self._stats.items()
+            }
@@ -0,0 +1,294 @@
+"""Offline precomputation of knowledge-base answers and test questions.
+
+Reads a syllabus CSV with a "topic" column and optional "level" and
+"difficulty" columns, then fills the get_information / explain_concept /
+get_study_tips caches and, with --test-sets, the pre-generated question pool:
+
+    python precompute.py syllabus.csv --concurrency 4 --test-sets 2
+    python precompute.py syllabus.csv --dry-run
+
+Results are saved as they complete, so an interrupted run can simply be
+started again: anything already cached is skipped.
+"""
+import argparse
+import csv
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+import components
+from config import Config
+
+LEVELS = ("beginner", "intermediate", "advanced")
+
+# Rough conversion used for the dry-run estimate
+CHARS_PER_TOKEN = 4
+
+
+def read_syllabus(path):
+    """Read (topic, level, difficulty) rows from a CSV file"""
+    rows = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            topic = (row.get("topic") or "").strip()
+            if not topic:
+                continue
+            level = (row.get("level") or "intermediate").strip().lower()
+            if level not in LEVELS:
+                level = "intermediate"
+            difficulty = (row.get("difficulty") or "medium").strip().lower()
+            rows.append((topic, level, difficulty))
+    return rows
+
+
+def build_tasks(rows, args):
+    """Turn syllabus rows into the list of missing cache entries.
+
+    Each task is (description, prompt_text, max_output_tokens, run), where run
+    performs the API call and returns an error string or None.
+    """
+    knowledge_base = components.get_knowledge_base()
+    api_manager = components.get_api_manager()
+    question_pool = components.get_question_pool()
+    router = api_manager.router
+
+    tasks = []
+    seen = set()
+
+    def prompt_of(messages):
+        return "\n".join(m["content"] for m in messages)
+
+    def add_kb_task(description, cache_key, messages, call_site, method, *method_args):
+        if cache_key in seen or knowledge_base.is_cached(cache_key):
+            return
+        seen.add(cache_key)
+
+        def run():
+            result = method(*method_args)
+            return result.get("error") if isinstance(result, dict) else None
+
+        tasks.append((description, prompt_of(messages), router.route(call_site)["max_tokens"], run))
+
+    for topic, level, difficulty in rows:
+        add_kb_task(
+            f"information: {topic}",
+            knowledge_base.information_key(topic),
+            knowledge_base.information_messages(topic),
+            "information",
+            knowledge_base.get_information, topic
+        )
+        add_kb_task(
+            f"explanation: {topic} ({level})",
+            knowledge_base.explanation_key(topic, level),
+            knowledge_base.explanation_messages(topic, level),
+            f"explanation:{level}",
+            knowledge_base.explain_concept, topic, level
+        )
+        add_kb_task(
+            f"study tips: {topic}",
+            knowledge_base.study_tips_key(topic),
+            knowledge_base.study_tips_messages(topic),
+            "study_tips",
+            knowledge_base.get_study_tips, topic
+        )
+
+        if args.test_sets <= 0:
+            continue
+
+        pool_args = (topic, args.num_questions, difficulty, args.question_types)
+        pool_key = question_pool.pool_key(*pool_args)
+        if pool_key in seen:
+            continue
+        seen.add(pool_key)
+
+        missing = args.test_sets - question_pool.count(*pool_args)
+        prompt = api_manager.test_questions_prompt(
+            topic, args.num_questions, difficulty, args.question_types
+        )
+        for i in range(missing):
+            def run(pool_args=pool_args):
+                topic, num_questions, difficulty, question_types = pool_args
+                result = api_manager.generate_test_questions(
+                    topic, num_questions, difficulty, question_types
+                )
+                if "error" in result:
+                    return result["error"]
+                question_pool.add(*pool_args, result.get("questions", []), save=False)
+                return None
+
+            tasks.append((
+                f"test questions: {topic} ({difficulty}) {i + 1}/{missing}",
+                prompt,
+                router.route("test_generation")["max_tokens"],
+                run
+            ))
+
+    return tasks
+
+
+def print_estimate(tasks):
+    """Print how many calls and tokens a run would use"""
+    input_tokens = sum(len(prompt) // CHARS_PER_TOKEN for _, prompt, _, _ in tasks)
+    output_tokens = sum(max_tokens for _, _, max_tokens, _ in tasks)
+
+    by_kind = {}
+    for description, _, _, _ in tasks:
+        kind = description.split(":", 1)[0]
+        by_kind[kind] = by_kind.get(kind, 0) + 1
+
+    print(f"{len(tasks)} API calls needed")
+    for kind, count in sorted(by_kind.items()):
+        print(f"  {kind}: {count}")
+    print(f"Estimated input tokens: ~{input_tokens}")
+    print(f"Output tokens: at most {output_tokens}")
+
+
+def positive_int(value):
+    """Parse an integer argument that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return number
+
+
+def parse_clock(value):
+    """Parse an HH:MM argument"""
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected HH:MM, got {value!r}")
+
+
+def wait_until(clock_time):
+    """Sleep until the next occurrence of clock_time"""
+    now = datetime.now()
+    start = datetime.combine(now.date(), clock_time)
+    if start < now:
+        start += timedelta(days=1)
+    print(f"Waiting until {start:%Y-%m-%d %H:%M} to start")
+    time.sleep((start - now).total_seconds())
+
+
+def past(clock_time, started):
+    """Whether clock_time has been reached since the run started"""
+    deadline = datetime.combine(started.date(), clock_time)
+    if deadline <= started:
+        deadline += timedelta(days=1)
+    return datetime.now() >= deadline
+
+
+def run_tasks(tasks, args):
+    """Run tasks with bounded concurrency, reporting progress as they finish"""
+    knowledge_base = components.get_knowledge_base()
+    question_pool = components.get_question_pool()
+    save_lock = threading.Lock()
+
+    def checkpoint():
+        # Knowledge-base answers are appended as they complete; only the
+        # question pool is saved in batches
+        with save_lock:
+            question_pool.save()
+
+    def timed(run):
+        started = time.monotonic()
+        return run(), time.monotonic() - started
+
+    started_at = datetime.now()
+    started = time.monotonic()
+    done = failed = 0
+    pending = {}
+    queue = iter(tasks)
+    stopped = False
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            try:
+                while True:
+                    # Keep at most `concurrency` calls in flight
+                    while not stopped and len(pending) < args.concurrency:
+                        if args.not_after and past(args.not_after, started_at):
+                            print("Reached --not-after, finishing in-flight calls and stopping")
+                            stopped = True
+                            break
+                        task = next(queue, None)
+                        if task is None:
+                            stopped = True
+                            break
+                        description, _, _, run = task
+                        pending[executor.submit(timed, run)] = description
+
+                    if not pending:
+                        break
+
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        description = pending.pop(future)
+                        try:
+                            error, elapsed = future.result()
+                        except Exception as e:
+                            error, elapsed = str(e), 0.0
+
+                        done += 1
+                        if error:
+                            failed += 1
+                        status = f"failed: {error}" if error else f"ok {elapsed:.1f}s"
+
+                        rate = done / max(time.monotonic() - started, 1e-9)
+                        eta = (len(tasks) - done) / rate if rate else 0
+                        print(f"[{done}/{len(tasks)}] {description} {status} (eta {eta:.0f}s)", flush=True)
+
+                        if done % args.checkpoint_every == 0:
+                            checkpoint()
+            except KeyboardInterrupt:
+                print("Interrupted, finishing calls in flight and saving progress")
+                for future in pending:
+                    future.cancel()
+    finally:
+        # Leaving the executor waits for calls in flight, so their results
+        # are included
+        checkpoint()
+        # Fold this run's answers into the snapshot workers start from
+        knowledge_base.compact()
+
+    print(f"Finished {done - failed} of {len(tasks)} calls ({failed} failed)")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute knowledge-base answers and test questions for a syllabus")
+    parser.add_argument('syllabus', help="CSV file with a 'topic' column and optional 'level' and 'difficulty' columns")
+    parser.add_argument('--concurrency', type=positive_int, default=4, help="maximum API calls in flight")
+    parser.add_argument('--test-sets', type=int, default=0, help="question sets to keep in the pool per topic")
+    parser.add_argument('--num-questions', type=positive_int, default=Config.DEFAULT_QUESTION_COUNT)
+    parser.add_argument('--question-types', default="multiple choice,true/false",
+                        type=lambda value: [t.strip() for t in value.split(",") if t.strip()])
+    parser.add_argument('--checkpoint-every', type=positive_int, default=10, help="save caches after this many calls")
+    parser.add_argument('--not-before', type=parse_clock, help="wait until this local time (HH:MM) before starting")
+    parser.add_argument('--not-after', type=parse_clock, help="stop starting new calls at this local time (HH:MM)")
+    parser.add_argument('--dry-run', action='store_true', help="only report what would be generated")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        # Only look up what is cached; never build or rewrite cache files
+        components.get_knowledge_base().read_only = True
+    
+    rows = read_syllabus(args.syllabus)
+    tasks = build_tasks(rows, args)
+    print(f"{len(rows)} syllabus rows")
+    print_estimate(tasks)
+
+    if args.dry_run or not tasks:
+        return 0
+
+    if args.not_before:
+        wait_until(args.not_before)
+
+    return 1 if run_tasks(tasks, args) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import os
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Parts of the app reported in the per-route breakdown, matched by source file
+# and, optionally, function name
+COMPONENTS = (
+    ("ChatBot.get_response", "chatbot.py", "get_response"),
+    ("KnowledgeBase", "knowledge_base.py", None),
+    ("APIManager", "api_manager.py", None),
+    ("MaterialIndex", "material_index.py", None),
+    ("TestSimulator", "test_simulator.py", None),
+)
+
+# Threads whose innermost frame is in one of these are idle
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "socketserver.py")
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+class SamplingProfiler:
+    """Samples the stacks of all app threads for a fixed period.
+
+    Nothing runs between profiles: the sampler thread only exists while a
+    profile is being taken, and requests are attributed to routes by finding
+    their view function on the sampled stack rather than by tracking requests.
+    """
+
+    def __init__(self, view_functions):
+        # Map each view function's code object to its endpoint name
+        self._views = {}
+        for endpoint, view in view_functions.items():
+            view = getattr(view, "__wrapped__", view)
+            code = getattr(view, "__code__", None)
+            if code is not None:
+                self._views[code] = endpoint
+        self._lock = threading.Lock()
+
+    def profile(self, duration, rate):
+        """Sample for `duration` seconds at `rate` Hz and return the report"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            return self._profile(duration, rate)
+        finally:
+            self._lock.release()
+
+    def _profile(self, duration, rate):
+        stacks = {}
+        samples = 0
+        interval = 1.0 / rate
+        ignored = {threading.get_ident()}  # the thread waiting for this report
+
+        def sample():
+            nonlocal samples
+            ignored.add(threading.get_ident())
+            deadline = time.monotonic() + duration
+            next_sample = time.monotonic()
+            while next_sample < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident in ignored:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(frame.f_code)
+                        frame = frame.f_back
+                    stack = tuple(reversed(stack))
+                    stacks[stack] = stacks.get(stack, 0) + 1
+                samples += 1
+
+                next_sample += interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+        started = time.monotonic()
+        sampler = threading.Thread(target=sample, name="profiler-sampler", daemon=True)
+        sampler.start()
+        sampler.join()
+        elapsed = time.monotonic() - started
+
+        return self._report(stacks, samples, duration, rate, elapsed)
+
+    def _is_app_code(self, code):
+        return code.co_filename.startswith(APP_DIR) and not code.co_filename.endswith("profiler.py")
+
+    def _label(self, code):
+        path = os.path.splitext(code.co_filename)[0]
+        if self._is_app_code(code):
+            module = os.path.basename(path)
+        else:
+            # Keep the package name so library frames such as flask/app are
+            # not confused with the app's own modules
+            module = "/".join(path.split(os.sep)[-2:])
+        return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+    def _report(self, stacks, samples, duration, rate, elapsed):
+        """Build collapsed stacks and the per-route component breakdown"""
+        collapsed = {}
+        routes = {}
+        thread_samples = 0
+
+        for stack, count in stacks.items():
+            # Only threads running app code are of interest; idle server and
+            # worker threads are skipped
+            if not any(self._is_app_code(code) for code in stack):
+                continue
+
+            route = next((self._views[code] for code in stack if code in self._views), None)
+            if route is None:
+                # Outside a request, only count threads doing work (such as a
+                # job generating a test), not ones waiting for it
+                if os.path.basename(stack[-1].co_filename) in IDLE_FILES:
+                    continue
+                route = "background"
+            thread_samples += count
+
+            line = ";".join([route] + [self._label(code) for code in stack])
+            collapsed[line] = collapsed.get(line, 0) + count
+
+            entry = routes.setdefault(route, {"samples": 0, "components": {}})
+            entry["samples"] += count
+            for name, filename, function in COMPONENTS:
+                if any(
+                    os.path.basename(code.co_filename) == filename
+                    and (function is None or code.co_name == function)
+                    for code in stack
+                ):
+                    entry["components"][name] = entry["components"].get(name, 0) + count
+
+        for entry in routes.values():
+            entry["percent"] = round(entry["samples"] / thread_samples * 100, 1) if thread_samples else 0
+            entry["components"] = {
+                name: {"samples": n, "percent": round(n / entry["samples"] * 100, 1)}
+                for name, n in sorted(entry["components"].items(), key=lambda item: -item[1])
+            }
+
+        return {
+            "duration": round(elapsed, 2),
+            "rate": rate,
+            "samples": samples,
+            "thread_samples": thread_samples,
+            "routes": dict(sorted(routes.items(), key=lambda item: -item[1]["samples"])),
+            "collapsed": "\n".join(
+                f"{line} {count}" for line, count in sorted(collapsed.items(), key=lambda item: -item[1])
+            ),
+        }
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+from config import Config
+from file_lock import file_lock
+
+
+class QuestionPool:
+    """Pre-generated question sets, keyed by the parameters of create_test.
+
+    Each stored set is handed out once, so students who happen to request the
+    same topic still get different questions while the pool lasts.
+    """
+
+    def __init__(self, pool_file=None):
+        self.config = Config()
+        self.pool_file = pool_file or self.config.QUESTION_POOL_FILE
+        self.lock_file = f"{self.pool_file}.lock"
+        self._lock = threading.Lock()
+        # The pool file as this process last read or wrote it. It is re-read
+        # whenever its stat changes, since precompute.py and other workers
+        # write the same file.
+        self._pool = None
+        self._pool_stat = None
+        # Sets added with save=False that are not in the file yet
+        self._pending = {}
+
+    @staticmethod
+    def pool_key(topic, num_questions, difficulty, question_types):
+        types_str = ",".join(sorted(t.lower() for t in question_types))
+        return f"{topic.lower().strip()}|{num_questions}|{difficulty.lower()}|{types_str}"
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.pool_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _load(self):
+        """Return the pool, re-reading the file if it has changed"""
+        stat = self._file_stat()
+        if self._pool is None or stat != self._pool_stat:
+            self._pool = {}
+            if stat is not None:
+                try:
+                    with open(self.pool_file, 'r') as f:
+                        self._pool = json.load(f)
+                except (json.JSONDecodeError, IOError):
+                    pass
+            self._pool_stat = stat
+        return self._pool
+
+    def _write(self, pool):
+        """Replace the pool file; callers hold the file lock"""
+        tmp_path = f"{self.pool_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(pool, f)
+        os.replace(tmp_path, self.pool_file)
+        self._pool_stat = self._file_stat()
+
+    def save(self):
+        """Merge sets added with save=False into the pool file"""
+        with self._lock, file_lock(self.lock_file):
+            if not self._pending:
+                return
+            pool = self._load()
+            for key, sets in self._pending.items():
+                pool.setdefault(key, []).extend(sets)
+            try:
+                self._write(pool)
+                self._pending = {}
+            except IOError:
+                # Re-read the file next time rather than trust the merged copy
+                self._pool = None
+
+    def count(self, topic, num_questions, difficulty, question_types):
+        """Number of unused question sets for these parameters"""
+        key = self.pool_key(topic, num_questions, difficulty, question_types)
+        with self._lock:
+            return len(self._load().get(key, [])) + len(self._pending.get(key, []))
+
+    def add(self, topic, num_questions, difficulty, question_types, questions, save=True):
+        """Add a generated question set to the pool"""
+        key = self.pool_key(topic, num_questions, difficulty, question_types)
+        with self._lock:
+            self._pending.setdefault(key, []).append(questions)
+        if save:
+            self.save()
+
+    def take(self, topic, num_questions, difficulty, question_types):
+        """Remove and return a question set, or None if the pool has none"""
+        key = self.pool_key(topic, num_questions, difficulty, question_types)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending:
+                return pending.pop()
+
+            # Read, pop and write under the file lock so two workers never
+            # hand out the same set
+            with file_lock(self.lock_file):
+                sets = self._load().get(key)
+                if not sets:
+                    return None
+                questions = sets.pop()
+                try:
+                    self._write(self._pool)
+                except IOError:
+                    pass
+            return questions
@@ -0,0 +1,89 @@
+import gzip
+import hashlib
+import os
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# One year; hashed asset names change whenever their content does
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+def _preferred_encoding(available):
+    """Pick the best encoding the client accepts out of `available`"""
+    accepted = request.accept_encodings
+    for encoding in available:
+        if accepted[encoding]:
+            return encoding
+    return None
+
+
+def _json_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def finalize_json(response):
+    """Add validators and compression to JSON responses.
+
+    GET/HEAD responses get an ETag computed from the uncompressed body, so a
+    client that already has the same data gets a 304 and no body. Responses
+    above COMPRESS_MIN_SIZE are compressed when the client accepts it.
+    """
+    if (
+        response.mimetype != 'application/json'
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    body = response.get_data()
+    encoding = None
+    if len(body) >= current_app.config['COMPRESS_MIN_SIZE']:
+        encoding = _preferred_encoding(_json_encodings())
+    response.vary.add('Accept-Encoding')
+
+    if request.method in ('GET', 'HEAD'):
+        # Each encoding is a different representation, so it gets its own tag
+        etag = hashlib.sha1(body).hexdigest()
+        response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+        response.headers.setdefault('Cache-Control', 'no-cache')
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=5))
+    elif encoding == "gzip":
+        response.set_data(gzip.compress(body, compresslevel=6, mtime=0))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+
+    return response
+
+
+def send_asset(output_folder, filename):
+    """Serve a hashed asset, using a precompressed copy when the client accepts one"""
+    path = safe_join(output_folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    available = [e for e, ext in (("br", ".br"), ("gzip", ".gz")) if os.path.exists(path + ext)]
+    encoding = _preferred_encoding(available)
+
+    response = send_file(
+        path + {"br": ".br", "gzip": ".gz"}[encoding] if encoding else path,
+        mimetype='text/css' if filename.endswith('.css') else 'application/javascript',
+        conditional=True,
+        etag=True
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
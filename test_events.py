@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Extra checkpoints, in seconds remaining, on top of the regular interval
+FINAL_CHECKPOINTS = (300, 60, 30, 10)
+
+
+class TestEventHub:
+    """Pushes timer checkpoints, expiry and results for running tests.
+
+    A single scheduler thread keeps a heap of upcoming checkpoints and
+    expiries for every test in progress, so timers cost nothing between
+    events. Subscribers (one per open event stream) receive events on their
+    own queue; a stream only blocks on its queue and does no timing itself.
+    """
+
+    def __init__(self, test_simulator, checkpoint_interval=None):
+        self.config = Config()
+        self.test_simulator = test_simulator
+        self.checkpoint_interval = checkpoint_interval or self.config.TEST_CHECKPOINT_INTERVAL
+
+        self._heap = []
+        self._sequence = itertools.count()
+        self._wakeup = threading.Condition()
+        self._subscribers = {}  # test_id -> set of queues
+        self._subscribers_lock = threading.Lock()
+
+        test_simulator.add_listener(self._on_test_event)
+        threading.Thread(target=self._run, name="test-event-scheduler", daemon=True).start()
+
+        # Tests started before the hub existed still get their timers
+        for test_id, test in list(test_simulator.active_tests.items()):
+            if test["status"] == "in_progress" and test["start_time"]:
+                elapsed = time.time() - test["start_time"].timestamp()
+                self._schedule(test_id, test["duration"] * 60 - elapsed)
+
+    # --- Scheduling ---
+
+    def _schedule(self, test_id, remaining):
+        """Queue the checkpoints and the expiry for a test with `remaining` seconds left"""
+        now = time.monotonic()
+        deadline = now + max(0, remaining)
+
+        offsets = set(FINAL_CHECKPOINTS)
+        offsets.update(range(0, int(remaining), self.checkpoint_interval))
+        with self._wakeup:
+            for offset in offsets:
+                if 0 < offset < remaining:
+                    heapq.heappush(self._heap, (deadline - offset, next(self._sequence), test_id, "tick"))
+            heapq.heappush(self._heap, (deadline, next(self._sequence), test_id, "expire"))
+            self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._wakeup.wait(timeout)
+                _, _, test_id, kind = heapq.heappop(self._heap)
+
+            try:
+                self._fire(test_id, kind)
+            except Exception:
+                logger.exception(f"Test timer {kind} failed for {test_id}")
+
+    def _fire(self, test_id, kind):
+        test = self.test_simulator.active_tests.get(test_id)
+        if test is None or test["status"] != "in_progress":
+            return
+
+        if kind == "expire":
+            # Completion is published through _on_test_event
+            self.test_simulator.expire_test(test_id)
+        else:
+            self.publish(test_id, "tick", self.test_simulator.get_test_status(test_id))
+
+    def _on_test_event(self, event, test_id, payload):
+        if event == "started":
+            self._schedule(test_id, payload["duration"])
+            self.publish(test_id, "tick", self.test_simulator.get_test_status(test_id))
+        elif event == "completed":
+            self.publish(test_id, "completed", payload)
+
+    # --- Subscribers ---
+
+    def subscribe(self, test_id):
+        """Return a queue that receives (event, data) pairs for a test"""
+        events = queue.Queue(maxsize=100)
+        with self._subscribers_lock:
+            self._subscribers.setdefault(test_id, set()).add(events)
+        return events
+
+    def unsubscribe(self, test_id, events):
+        with self._subscribers_lock:
+            subscribers = self._subscribers.get(test_id)
+            if subscribers:
+                subscribers.discard(events)
+                if not subscribers:
+                    del self._subscribers[test_id]
+
+    def publish(self, test_id, event, data):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers.get(test_id, ()))
+        for events in subscribers:
+            try:
+                events.put_nowait((event, data))
+            except queue.Full:
+                # A stalled client only misses checkpoints; it will get the next one
+                pass
+
+    def stats(self):
+        with self._subscribers_lock:
+            streams = sum(len(s) for s in self._subscribers.values())
+        with self._wakeup:
+            timers = len(self._heap)
+        return {"open_streams": streams, "pending_timers": timers}
@@ -1,25 +1,58 @@
 import json
+import logging
+import random
+import threading
 import time
 import uuid
 from datetime import datetime, timedelta
 from api_manager import APIManager
 
+logger = logging.getLogger(__name__)
+
 class TestSimulator:
-    def __init__(self):
-        self.api_manager = APIManager()
+    def __init__(self, api_manager=None, question_pool=None):
+        self.api_manager = api_manager or APIManager()
+        self.question_pool = question_pool  # optional pre-generated question sets
         self.active_tests = {}  # Store active test sessions
+        self.classes = {}  # Class assignments sharing one question set
+        self._listeners = []  # called as listener(event, test_id, payload)
+        self._lock = threading.RLock()
     
-    def create_test(self, topic, num_questions, difficulty, question_types, duration):
-        """Create a new test session"""
-        test_id = str(uuid.uuid4())
+    def add_listener(self, listener):
+        """Register a callback for "started" and "completed" test events"""
+        self._listeners.append(listener)
+    
+    def _notify(self, event, test_id, payload):
+        for listener in self._listeners:
+            try:
+                listener(event, test_id, payload)
+            except Exception:
+                logger.exception(f"Test listener failed on {event} for {test_id}")
+    
+    def _get_questions(self, topic, num_questions, difficulty, question_types):
+        """Return a question list from the pool or the API, or an error dict"""
+        # Use a pre-generated question set if one is available
+        questions = None
+        if self.question_pool is not None:
+            questions = self.question_pool.take(topic, num_questions, difficulty, question_types)
         
-        # Generate questions
-        questions_data = self.api_manager.generate_test_questions(
-            topic, num_questions, difficulty, question_types
-        )
+        if questions is None:
+            # Generate questions
+            questions_data = self.api_manager.generate_test_questions(
+                topic, num_questions, difficulty, question_types
+            )
+            
+            if "error" in questions_data:
+                return {"error": questions_data["error"]}
+            
+            questions = questions_data.get("questions", [])
         
-        if "error" in questions_data:
-            return {"error": questions_data["error"]}
+        # Question lists may be shared between sessions, so they are never modified
+        return tuple(questions)
+    
+    def _new_test(self, topic, difficulty, duration, questions, seed=None, class_id=None, student=None, session_id=None):
+        """Register a test session for a question list and return its id"""
+        test_id = str(uuid.uuid4())
         
         # Create test session
         test_session = {
@@ -27,7 +60,11 @@ class TestSimulator:
             "topic": topic,
             "difficulty": difficulty,
             "duration": duration,  # in minutes
-            "questions": questions_data.get("questions", []),
+            "questions": questions,
+            "seed": seed,  # question/option shuffle, None to keep the generated order
+            "class_id": class_id,
+            "student": student,
+            "session_id": session_id,  # the student's browser session, for analytics
             "current_question": 0,
             "answers": {},
             "start_time": None,
@@ -37,25 +74,93 @@ class TestSimulator:
         }
         
         self.active_tests[test_id] = test_session
+        return test_id
+    
+    def create_test(self, topic, num_questions, difficulty, question_types, duration, session_id=None):
+        """Create a new test session"""
+        questions = self._get_questions(topic, num_questions, difficulty, question_types)
+        
+        if isinstance(questions, dict):
+            return questions
+        
+        test_id = self._new_test(topic, difficulty, duration, questions, session_id=session_id)
         
         return {
             "test_id": test_id,
-            "num_questions": len(test_session["questions"]),
+            "num_questions": len(questions),
             "duration": duration
         }
     
+    def create_class_tests(self, topic, num_questions, difficulty, question_types, duration, students, shuffle=True):
+        """Create one test session per student from a single generated question set"""
+        questions = self._get_questions(topic, num_questions, difficulty, question_types)
+        
+        if isinstance(questions, dict):
+            return questions
+        
+        class_id = str(uuid.uuid4())
+        tests = []
+        for student in students:
+            seed = random.getrandbits(32) if shuffle else None
+            test_id = self._new_test(topic, difficulty, duration, questions, seed, class_id, student)
+            tests.append({"student": student, "test_id": test_id})
+        
+        self.classes[class_id] = {
+            "id": class_id,
+            "topic": topic,
+            "difficulty": difficulty,
+            "questions": questions,
+            "test_ids": [t["test_id"] for t in tests],
+            "created_at": datetime.now()
+        }
+        
+        return {
+            "class_id": class_id,
+            "num_questions": len(questions),
+            "duration": duration,
+            "tests": tests
+        }
+    
+    def _question_order(self, test):
+        """Map presentation position to index in the shared question list"""
+        order = list(range(len(test["questions"])))
+        if test["seed"] is not None:
+            random.Random(test["seed"]).shuffle(order)
+        return order
+    
+    def _question(self, test, position):
+        """Return the question shown at a position, with this session's option order"""
+        index = self._question_order(test)[position]
+        question = test["questions"][index]
+        
+        if test["seed"] is None or not question.get("options"):
+            return question
+        
+        # Copy rather than modify the shared question
+        options = list(question["options"])
+        random.Random(test["seed"] + index).shuffle(options)
+        return dict(question, options=options)
+    
     def start_test(self, test_id):
         """Start a test session"""
         if test_id not in self.active_tests:
             return {"error": "Test not found"}
         
         test = self.active_tests[test_id]
-        test["status"] = "in_progress"
-        test["start_time"] = datetime.now()
+        
+        # Restarting would reset the timer and reschedule expiry of a test
+        # that is already running or has been scored
+        with self._lock:
+            if test["status"] != "created":
+                return {"error": "Test has already been started"}
+            test["status"] = "in_progress"
+            test["start_time"] = datetime.now()
+        
+        self._notify("started", test_id, {"duration": test["duration"] * 60})
         
         return {
             "test_id": test_id,
-            "question": test["questions"][0],
+            "question": self._question(test, 0),
             "question_number": 1,
             "total_questions": len(test["questions"]),
             "time_remaining": test["time_remaining"]
@@ -79,7 +184,7 @@ class TestSimulator:
         test["current_question"] += 1
         
         return {
-            "question": test["questions"][test["current_question"]],
+            "question": self._question(test, test["current_question"]),
             "question_number": test["current_question"] + 1,
             "total_questions": len(test["questions"]),
             "time_remaining": test["time_remaining"]
@@ -105,13 +210,38 @@ class TestSimulator:
         if test_id not in self.active_tests:
             return {"error": "Test not found"}
         
-        test = self.active_tests[test_id]
-        test["status"] = "completed"
-        test["end_time"] = datetime.now()
+        return self._complete(self.active_tests[test_id])
+    
+    def expire_test(self, test_id):
+        """Complete a test if its time has run out; used by the timer scheduler"""
+        test = self.active_tests.get(test_id)
+        if test is None or test["status"] != "in_progress":
+            return None
+        
+        elapsed = (datetime.now() - test["start_time"]).total_seconds()
+        if elapsed < test["duration"] * 60:
+            return None
+        
+        return self._complete(test)
+    
+    def _complete(self, test):
+        """Mark a test completed and return its results.
+        
+        Completing an already completed test returns the same results without
+        changing the end time or notifying listeners again.
+        """
+        with self._lock:
+            newly_completed = test["status"] != "completed"
+            if newly_completed:
+                test["status"] = "completed"
+                test["end_time"] = datetime.now()
         
         # Calculate results
         results = self._calculate_results(test)
         
+        if newly_completed:
+            self._notify("completed", test["id"], results)
+        
         return results
     
     def _calculate_results(self, test):
@@ -122,7 +252,8 @@ class TestSimulator:
         
         detailed_results = []
         
-        for i, question in enumerate(questions):
+        for i, index in enumerate(self._question_order(test)):
+            question = questions[index]
             user_answer = answers.get(i, "")
             correct_answer = question.get("answer", "")
             is_correct = self._compare_answers(user_answer, correct_answer, question.get("type", ""))
@@ -135,7 +266,9 @@ class TestSimulator:
                 "user_answer": user_answer,
                 "correct_answer": correct_answer,
                 "is_correct": is_correct,
-                "explanation": question.get("explanation", "")
+                "explanation": question.get("explanation", ""),
+                "question_index": index,
+                "type": question.get("type", "")
             })
         
         # Calculate time taken
@@ -152,6 +285,7 @@ class TestSimulator:
             "correct_answers": correct_count,
             "percentage": round((correct_count / len(questions)) * 100, 2),
             "time_taken": round(time_taken, 2),
+            "session_id": test["session_id"],
             "detailed_results": detailed_results
         }
     
@@ -181,9 +315,7 @@ class TestSimulator:
             
             # Auto-complete if time is up
             if test["time_remaining"] <= 0:
-                test["status"] = "completed"
-                test["end_time"] = datetime.now()
-                return self._calculate_results(test)
+                return self._complete(test)
         
         return {
             "test_id": test_id,
@@ -191,4 +323,54 @@ class TestSimulator:
             "current_question": test["current_question"] + 1,
             "total_questions": len(test["questions"]),
             "time_remaining": test["time_remaining"]
+        }
+    
+    def get_class_results(self, class_id):
+        """Summarize the results of every student in a class"""
+        if class_id not in self.classes:
+            return {"error": "Class not found"}
+        
+        assignment = self.classes[class_id]
+        num_questions = len(assignment["questions"])
+        correct_per_question = [0] * num_questions
+        students = []
+        percentages = []
+        times = []
+        
+        for test_id in assignment["test_ids"]:
+            test = self.active_tests[test_id]
+            summary = {"student": test["student"], "test_id": test_id, "status": test["status"]}
+            
+            if test["status"] == "completed":
+                results = self._calculate_results(test)
+                summary["percentage"] = results["percentage"]
+                summary["correct_answers"] = results["correct_answers"]
+                summary["time_taken"] = results["time_taken"]
+                percentages.append(results["percentage"])
+                times.append(results["time_taken"])
+                for result in results["detailed_results"]:
+                    if result["is_correct"]:
+                        correct_per_question[result["question_index"]] += 1
+            
+            students.append(summary)
+        
+        completed = len(percentages)
+        return {
+            "class_id": class_id,
+            "topic": assignment["topic"],
+            "difficulty": assignment["difficulty"],
+            "num_students": len(students),
+            "completed": completed,
+            "average_percentage": round(sum(percentages) / completed, 2) if completed else 0,
+            "highest_percentage": max(percentages) if completed else 0,
+            "lowest_percentage": min(percentages) if completed else 0,
+            "average_time_taken": round(sum(times) / completed, 2) if completed else 0,
+            "questions": [
+                {
+                    "question": question.get("question", ""),
+                    "correct_rate": round(correct_per_question[i] / completed * 100, 2) if completed else 0
+                }
+                for i, question in enumerate(assignment["questions"])
+            ],
+            "students": students
         }
\ No newline at end of file
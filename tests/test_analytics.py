@@ -0,0 +1,113 @@
+import random
+import statistics
+import pytest
+import components
+from analytics import TIME_BUCKET_RATIO, AnalyticsStore, RunningStats, TimeSketch
+from config import Config
+
+
+def results(topic="Biology", difficulty="easy", session_id=None, answers=(True, False), time_taken=60.0):
+    correct = sum(answers)
+    return {
+        "topic": topic,
+        "difficulty": difficulty,
+        "total_questions": len(answers),
+        "correct_answers": correct,
+        "percentage": round(correct / len(answers) * 100, 2),
+        "time_taken": time_taken,
+        "session_id": session_id,
+        "detailed_results": [
+            {"type": "true/false" if i % 2 else "multiple choice", "is_correct": ok}
+            for i, ok in enumerate(answers)
+        ],
+    }
+
+
+def test_running_stats_match_the_statistics_module():
+    rng = random.Random(1)
+    values = [rng.uniform(0, 100) for _ in range(1000)]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    summary = stats.summary()
+    assert summary["count"] == len(values)
+    assert summary["mean"] == round(statistics.mean(values), 2)
+    assert summary["stddev"] == round(statistics.stdev(values), 2)
+    assert (summary["min"], summary["max"]) == (min(values), max(values))
+    assert RunningStats().summary()["stddev"] == 0.0
+
+
+@pytest.mark.parametrize("q", [0.1, 0.5, 0.9, 0.99])
+def test_time_sketch_quantiles_are_within_one_bucket(q):
+    rng = random.Random(2)
+    values = sorted(rng.lognormvariate(5, 1) for _ in range(5000))
+    sketch = TimeSketch()
+    for value in values:
+        sketch.add(value)
+
+    exact = values[int(q * len(values)) - 1]
+    assert exact / TIME_BUCKET_RATIO <= sketch.quantile(q) <= exact * TIME_BUCKET_RATIO
+    assert TimeSketch().quantile(0.5) is None
+
+
+def test_record_updates_every_dimension():
+    store = AnalyticsStore(secret="test")
+    store.record(results(answers=(True, True), time_taken=30, session_id="s1"))
+    store.record(results(topic=" biology ", difficulty="Hard", answers=(True, False, False, False)))
+    # Tests without questions are ignored
+    store.record(dict(results(), total_questions=0))
+
+    overall = store.get("overall", "all")
+    assert overall["score"]["count"] == 2
+    assert overall["score"]["mean"] == 62.5
+    assert overall["questions"] == 6 and overall["accuracy"] == 50.0
+
+    assert store.get("topic", "BIOLOGY")["score"]["count"] == 2
+    assert store.keys("difficulty") == ["easy", "hard"]
+    assert store.get("question_type", "multiple choice")["questions"] == 3
+    assert store.get("question_type", "true/false")["accuracy"] == 33.33
+    assert store.get("topic", "chemistry") is None
+    assert store.get("nonsense", "x") is None
+
+
+def test_sessions_are_stored_under_a_keyed_hash():
+    store = AnalyticsStore(secret="test")
+    store.record(results(session_id="chat-session-id"))
+
+    assert store.get("session", "chat-session-id")["score"]["count"] == 1
+    assert store.keys("session") == [store._session_key("chat-session-id")]
+    assert "chat-session-id" not in store.keys("session")[0]
+    # The hash depends on the secret, so it cannot be computed from the id alone
+    assert AnalyticsStore(secret="other")._session_key("chat-session-id") != store.keys("session")[0]
+
+
+@pytest.fixture
+def client(tmp_path):
+    import app
+
+    class TestConfig(Config):
+        TESTING = True
+        UPLOAD_FOLDER = str(tmp_path / "uploads")
+        MATERIAL_REFRESH_SECONDS = 0
+
+    components.reset()
+    components.get_analytics().record(results(session_id="mine"))
+    components.get_analytics().record(results(session_id="theirs"))
+    client = app.create_app(TestConfig).test_client()
+    with client.session_transaction() as sess:
+        sess['session_id'] = "mine"
+    yield client
+    components.reset()
+
+
+def test_unknown_dimensions_are_not_found(client):
+    assert client.get('/api/analytics/nonsense').status_code == 404
+    assert client.get('/api/analytics/nonsense/key').status_code == 404
+    assert client.get('/api/analytics/topic').get_json()["keys"] == ["biology"]
+
+
+def test_only_the_callers_own_session_is_listed_or_shown(client):
+    assert client.get('/api/analytics/session').get_json()["keys"] == ["mine"]
+    assert client.get('/api/analytics/session/mine').status_code == 200
+    assert client.get('/api/analytics/session/theirs').status_code == 404
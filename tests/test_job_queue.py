@@ -0,0 +1,104 @@
+import os
+import threading
+import pytest
+from job_queue import JobQueue, QueueFull
+
+
+def blocked_queue(max_depth=10):
+    """A one-worker queue whose worker is held by a job until release is set"""
+    job_queue = JobQueue(workers=1, max_depth=max_depth, retention=60)
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+        return {"ok": True}
+
+    blocker_id = job_queue.submit(blocker)
+    assert started.wait(5)
+    return job_queue, release, blocker_id
+
+
+def wait_done(job_queue, job_id):
+    status = None
+    while status not in ("done", "failed"):
+        job = job_queue.wait(job_id, status, timeout=5)
+        assert job is not None and job["status"] != status, "job did not finish"
+        status = job["status"]
+    return job
+
+
+def test_rejects_jobs_beyond_max_depth():
+    job_queue, release, _ = blocked_queue(max_depth=2)
+    job_queue.submit(lambda: None)
+    job_queue.submit(lambda: None)
+
+    with pytest.raises(QueueFull):
+        job_queue.submit(lambda: None)
+
+    stats = job_queue.stats()
+    assert stats["queue_depth"] == 2
+    assert stats["running"] == 1
+    assert stats["rejected"] == 1
+    release.set()
+
+
+def test_runs_higher_priority_first_and_fifo_within_a_priority():
+    job_queue, release, _ = blocked_queue()
+    order = []
+    jobs = [
+        job_queue.submit(order.append, "low", priority="low"),
+        job_queue.submit(order.append, "normal 1"),
+        job_queue.submit(order.append, "high", priority="high"),
+        job_queue.submit(order.append, "normal 2", priority="normal"),
+    ]
+
+    release.set()
+    for job_id in jobs:
+        wait_done(job_queue, job_id)
+
+    assert order == ["high", "normal 1", "normal 2", "low"]
+
+
+def test_error_results_and_exceptions_mark_the_job_failed():
+    job_queue = JobQueue(workers=1, max_depth=10, retention=60)
+
+    def boom():
+        raise RuntimeError("boom")
+
+    ok = wait_done(job_queue, job_queue.submit(lambda: {"test_id": "t"}))
+    error = wait_done(job_queue, job_queue.submit(lambda: {"error": "no questions"}))
+    raised = wait_done(job_queue, job_queue.submit(boom))
+
+    assert ok["status"] == "done" and ok["result"] == {"test_id": "t"}
+    assert error["status"] == "failed" and error["result"] == {"error": "no questions"}
+    assert raised["status"] == "failed" and raised["result"] == {"error": "boom"}
+
+
+def test_unknown_job():
+    job_queue = JobQueue(workers=1, max_depth=10, retention=60)
+    assert job_queue.get("missing") is None
+    assert job_queue.wait("missing", timeout=0.1) is None
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_runs_jobs_in_a_child_forked_after_workers_started():
+    job_queue, release, blocker_id = blocked_queue()
+    read_fd, write_fd = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        # The parent's worker is stuck in blocker(), and gone in the child
+        try:
+            job = wait_done(job_queue, job_queue.submit(lambda: {"ok": True}))
+            ok = job["result"] == {"ok": True} and job_queue.get(blocker_id) is None
+            os.write(write_fd, b"ok" if ok else b"bad")
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 16) == b"ok"
+    os.close(read_fd)
+    release.set()
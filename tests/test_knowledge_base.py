@@ -0,0 +1,99 @@
+import json
+import os
+import pytest
+from knowledge_base import KnowledgeBase
+
+
+class StubAPI:
+    def __init__(self):
+        self.calls = 0
+
+    def get_chatbot_response(self, messages, call_site="chat"):
+        self.calls += 1
+        return {"content": f"answer {self.calls}"}
+
+
+@pytest.fixture
+def folder(tmp_path):
+    with open(tmp_path / "knowledge_cache.json", 'w') as f:
+        json.dump({"alpha": "A"}, f)
+    return tmp_path
+
+
+def make_kb(folder, api=None):
+    knowledge_base = KnowledgeBase(api or StubAPI())
+    knowledge_base.cache_file = str(folder / "knowledge_cache.json")
+    knowledge_base.snapshot_file = str(folder / "knowledge_cache.snapshot")
+    knowledge_base.delta_file = str(folder / "knowledge_cache.delta")
+    knowledge_base.lock_file = str(folder / "knowledge_cache.json.lock")
+    return knowledge_base
+
+
+def test_first_load_builds_a_snapshot_once(folder):
+    first = make_kb(folder)
+    assert first.get_information("Alpha") == "A"
+    snapshot_mtime = os.stat(first.snapshot_file).st_mtime_ns
+
+    # A second worker maps the snapshot instead of rebuilding it
+    second = make_kb(folder)
+    assert second.get_information("alpha") == "A"
+    assert os.stat(second.snapshot_file).st_mtime_ns == snapshot_mtime
+
+
+def test_new_entries_are_appended_not_rewritten(folder):
+    api = StubAPI()
+    knowledge_base = make_kb(folder, api)
+    knowledge_base.get_information("alpha")
+    cache_mtime = os.stat(knowledge_base.cache_file).st_mtime_ns
+
+    assert knowledge_base.get_information("beta") == "answer 1"
+    assert knowledge_base.get_information("beta") == "answer 1"
+    assert api.calls == 1
+
+    assert os.stat(knowledge_base.cache_file).st_mtime_ns == cache_mtime
+    with open(knowledge_base.delta_file) as f:
+        assert [json.loads(line) for line in f] == [["beta", "answer 1"]]
+
+    # A fresh worker reads the delta on load
+    assert make_kb(folder).is_cached("beta")
+
+
+def test_refresh_picks_up_other_workers_entries(folder):
+    live = make_kb(folder)
+    assert not live.is_cached("gamma")
+
+    batch = make_kb(folder)
+    batch._cache_set("gamma", "G")
+    assert live._cache_get("gamma") == "G"
+
+    # After another process compacts, the new snapshot is opened
+    batch._cache_set("delta", "D")
+    batch.compact()
+    assert live._cache_get("delta") == "D"
+    assert live._cache_get("gamma") == "G"
+
+
+def test_compact_keeps_entries_from_every_worker(folder):
+    live = make_kb(folder)
+    live.is_cached("alpha")
+    batch = make_kb(folder)
+    for key in ("beta", "gamma"):
+        batch._cache_set(key, key.upper())
+    batch.compact()
+
+    # A worker with a stale view writing and compacting must not drop them
+    live._cache_set("epsilon", "E")
+    live.compact()
+
+    with open(live.cache_file) as f:
+        assert json.load(f) == {"alpha": "A", "beta": "BETA", "gamma": "GAMMA", "epsilon": "E"}
+    assert os.path.getsize(live.delta_file) == 0
+
+
+def test_read_only_lookups_leave_the_files_alone(folder):
+    knowledge_base = make_kb(folder)
+    knowledge_base.read_only = True
+
+    assert knowledge_base.is_cached("alpha")
+    assert not knowledge_base.is_cached("beta")
+    assert sorted(os.listdir(folder)) == ["knowledge_cache.json"]
@@ -0,0 +1,118 @@
+import os
+import pytest
+from material_index import MaterialIndex, iter_chunks
+
+PARAGRAPHS = {
+    "cells.txt": [
+        "Mitochondria produce energy for the cell.",
+        "The cell membrane controls what enters the cell.",
+    ],
+    "plants.txt": [
+        "Photosynthesis turns light into chemical energy in plants.",
+    ],
+}
+
+
+def write_file(folder, filename, paragraphs):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, filename), 'w') as f:
+        f.write("\n\n".join(paragraphs) + "\n")
+
+
+def make_index(tmp_path, name="index"):
+    index = MaterialIndex(str(tmp_path / "uploads"), str(tmp_path / name))
+    index.chunk_chars = 30  # one chunk per paragraph
+    return index
+
+
+@pytest.fixture
+def index(tmp_path):
+    for filename, paragraphs in PARAGRAPHS.items():
+        write_file(tmp_path / "uploads", filename, paragraphs)
+    index = make_index(tmp_path)
+    index.refresh()
+    return index
+
+
+def test_chunks_end_at_paragraphs_and_split_long_ones():
+    lines = ["one two", "three", "", "four", "", "x " * 30]
+
+    assert list(iter_chunks(lines, 5)) == ["one two three", "four"] + ["x x x x x"] * 6
+    assert list(iter_chunks(lines, 1000)) == [" ".join(["one", "two", "three", "four"] + ["x"] * 30)]
+
+
+def test_refresh_builds_one_segment_per_file(index):
+    assert index.list_files() == [
+        {"filename": "cells.txt", "chunks": 2, "shared": True},
+        {"filename": "plants.txt", "chunks": 1, "shared": True},
+    ]
+    assert len(os.listdir(index.segment_folder)) == 2
+    assert index.refresh() == []
+
+    results = index.search("mitochondria energy", k=1)
+    assert results[0]["file"] == "cells.txt"
+    assert results[0]["text"] == PARAGRAPHS["cells.txt"][0]
+
+
+def test_scores_match_a_single_index_over_every_file(tmp_path, index):
+    write_file(tmp_path / "single", "all.txt", PARAGRAPHS["cells.txt"] + PARAGRAPHS["plants.txt"])
+    single = MaterialIndex(str(tmp_path / "single"), str(tmp_path / "single_index"))
+    single.chunk_chars = index.chunk_chars
+    single.refresh()
+
+    for query in ["cell energy", "energy", "light plants membrane"]:
+        segmented = index.search(query, k=3)
+        combined = single.search(query, k=3)
+        assert [(r["text"], r["score"]) for r in segmented] == \
+            [(r["text"], r["score"]) for r in combined]
+
+
+def test_reingest_replaces_and_refresh_removes_segments(tmp_path, index):
+    write_file(tmp_path / "uploads", "plants.txt", ["Chlorophyll in the leaves absorbs sunlight.", "Roots absorb water and minerals from the soil."])
+    assert index.ingest("plants.txt") == {"filename": "plants.txt", "chunks": 2}
+
+    assert index.search("photosynthesis") == []
+    assert index.search("chlorophyll")[0]["file"] == "plants.txt"
+    assert len(os.listdir(index.segment_folder)) == 2
+
+    os.remove(tmp_path / "uploads" / "cells.txt")
+    assert index.refresh() == []
+    assert [f["filename"] for f in index.list_files()] == ["plants.txt"]
+    assert index.search("mitochondria") == []
+    assert len(os.listdir(index.segment_folder)) == 1
+
+
+def test_min_coverage_ignores_passages_matching_only_common_words(index):
+    write_file(index.upload_folder, "study.txt", [
+        "Explain each answer in your own words.",
+        "Explain the steps before giving the result.",
+    ])
+    index.refresh()
+
+    # Nothing is about osmosis, and "explain" alone is not enough
+    assert index.search("Can you explain osmosis to me?")
+    assert index.search("Can you explain osmosis to me?", min_coverage=0.5) == []
+
+    results = index.search("Explain photosynthesis", min_coverage=0.5)
+    assert [r["file"] for r in results] == ["plants.txt"]
+
+
+def test_uploads_are_only_searched_for_their_owner(tmp_path, index):
+    write_file(os.path.dirname(index.path("notes.txt", "alice")), "notes.txt",
+               ["Alice's notes on mitochondria and the krebs cycle."])
+    index.ingest("notes.txt", "alice")
+
+    assert index.search("krebs", owner="alice")[0]["file"] == "notes.txt"
+    assert index.search("krebs", owner="bob") == []
+    assert index.search("krebs") == []
+    # The shared files are searched for everyone
+    assert index.search("photosynthesis", owner="alice")[0]["file"] == "plants.txt"
+
+    assert {"filename": "notes.txt", "chunks": 1, "shared": False} in index.list_files("alice")
+    assert "notes.txt" not in [f["filename"] for f in index.list_files("bob")]
+
+    # refresh() keeps owned files and drops them once deleted
+    assert index.refresh() == []
+    os.remove(index.path("notes.txt", "alice"))
+    index.refresh()
+    assert index.search("krebs", owner="alice") == []
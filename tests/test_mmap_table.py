@@ -0,0 +1,54 @@
+import random
+import pytest
+from mmap_table import SAMPLE_EVERY, MmapTable
+
+
+def write_table(tmp_path, keys):
+    path = str(tmp_path / "test.table")
+    MmapTable.write(path, ((key, key[::-1]) for key in keys))
+    return MmapTable(path)
+
+
+@pytest.mark.parametrize("count", [0, 1, SAMPLE_EVERY - 1, SAMPLE_EVERY, SAMPLE_EVERY + 1, 1000])
+def test_finds_every_key_and_nothing_else(tmp_path, count):
+    rng = random.Random(count)
+    keys = sorted({rng.randbytes(rng.randint(1, 6)) for _ in range(count)})
+    table = write_table(tmp_path, keys)
+
+    assert len(table) == len(keys)
+    for key in keys:
+        assert table.get(key) == key[::-1]
+
+    present = set(keys)
+    for _ in range(500):
+        key = rng.randbytes(rng.randint(1, 6))
+        assert table.get(key) == (key[::-1] if key in present else None)
+
+
+def test_keys_before_after_and_on_sample_boundaries(tmp_path):
+    keys = [f"key{i:04d}".encode() for i in range(SAMPLE_EVERY * 3)]
+    table = write_table(tmp_path, keys)
+
+    assert table.get(b"a") is None  # before the first key
+    assert table.get(b"z") is None  # after the last key
+    for i in (0, SAMPLE_EVERY - 1, SAMPLE_EVERY, 2 * SAMPLE_EVERY, len(keys) - 1):
+        assert table.get(keys[i]) == keys[i][::-1]
+    assert table.get("key0001", b"default") == b"1000yek"
+    assert table.get("missing", b"default") == b"default"
+
+
+def test_items_are_sorted_and_write_is_atomic(tmp_path):
+    table = write_table(tmp_path, [b"b", b"a", b"c"])
+    assert [key for key, _ in table.items()] == [b"a", b"b", b"c"]
+    assert not (tmp_path / "test.table.tmp").exists()
+
+
+def test_rejects_files_that_are_not_tables(tmp_path):
+    path = tmp_path / "not.table"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        MmapTable(str(path))
+
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        MmapTable(str(path))
@@ -0,0 +1,146 @@
+import pytest
+from types import SimpleNamespace
+import model_router
+from api_manager import APIManager
+from config import Config
+from model_router import MIN_SAMPLES, PROBE_SECONDS, ModelRouter
+
+FAST = "fast-model"
+DEFAULT = "default-model"
+
+
+@pytest.fixture
+def config():
+    config = Config()
+    config.GEMINI_API_KEY = "test-key"
+    config.GEMINI_FAST_MODEL = FAST
+    config.GEMINI_MODEL = DEFAULT
+    config.GEMINI_LARGE_PROMPT_CHARS = 1000
+    return config
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the router's clock with one the test moves forward"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(model_router, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def record_many(router, model, latency, call_site, count=MIN_SAMPLES):
+    for _ in range(count):
+        router.record(model, latency, True, call_site)
+
+
+def test_routes_list_models_in_preference_order(config):
+    router = ModelRouter(config)
+    assert router.candidates("chat") == [FAST, DEFAULT]
+    assert router.candidates("test_generation") == [DEFAULT, FAST]
+    # Unknown call sites use the chat route
+    assert router.candidates("something_else") == [FAST, DEFAULT]
+
+
+def test_large_prompts_prefer_the_default_model(config):
+    router = ModelRouter(config)
+    assert router.candidates("chat", prompt_chars=5000) == [DEFAULT, FAST]
+
+
+def test_failing_model_is_tried_last(config):
+    router = ModelRouter(config)
+    for _ in range(MIN_SAMPLES):
+        router.record(DEFAULT, 1.0, False, "test_generation")
+
+    assert router.candidates("test_generation") == [FAST, DEFAULT]
+    assert router.stats()[DEFAULT]["healthy"] is False
+
+
+def test_slow_preferred_model_yields_to_the_fastest(config, clock):
+    router = ModelRouter(config)
+    router.record(FAST, 2.0, True, "explanation:advanced")
+    record_many(router, DEFAULT, 20.0, "explanation:advanced", MIN_SAMPLES - 1)
+
+    # Over the 15 s budget of explanation:advanced, but on too few calls
+    assert router.candidates("explanation:advanced") == [DEFAULT, FAST]
+
+    router.record(DEFAULT, 20.0, True, "explanation:advanced")
+    assert router.candidates("explanation:advanced") == [FAST, DEFAULT]
+
+
+def test_slow_model_is_probed_and_recovers(config, clock):
+    router = ModelRouter(config)
+    router.record(FAST, 2.0, True, "explanation:advanced")
+    record_many(router, DEFAULT, 20.0, "explanation:advanced")
+    assert router.candidates("explanation:advanced") == [FAST, DEFAULT]
+
+    # Only FAST is called now, so DEFAULT's latency is only measured again
+    # by a probe: one call gets DEFAULT first once PROBE_SECONDS have passed
+    clock.now += PROBE_SECONDS
+    assert router.candidates("explanation:advanced") == [DEFAULT, FAST]
+    assert router.candidates("explanation:advanced") == [FAST, DEFAULT]
+
+    # A quick answer outweighs the old slow ones
+    router.record(DEFAULT, 3.0, True, "explanation:advanced")
+    assert router.candidates("explanation:advanced") == [DEFAULT, FAST]
+    assert router.stats()[DEFAULT]["latency"]["explanation:advanced"] < 15
+
+
+def test_probes_a_slow_model_that_stays_slow_again_later(config, clock):
+    router = ModelRouter(config)
+    router.record(FAST, 2.0, True, "explanation:advanced")
+    record_many(router, DEFAULT, 40.0, "explanation:advanced")
+
+    clock.now += PROBE_SECONDS
+    assert router.candidates("explanation:advanced")[0] == DEFAULT
+    router.record(DEFAULT, 40.0, True, "explanation:advanced")
+
+    assert router.candidates("explanation:advanced") == [FAST, DEFAULT]
+    clock.now += PROBE_SECONDS - 1
+    assert router.candidates("explanation:advanced") == [FAST, DEFAULT]
+    clock.now += 1
+    assert router.candidates("explanation:advanced") == [DEFAULT, FAST]
+
+
+def test_latency_of_one_call_site_does_not_reroute_another(config, clock):
+    router = ModelRouter(config)
+    record_many(router, DEFAULT, 40.0, "test_generation")
+    router.record(FAST, 2.0, True, "test_generation")
+    record_many(router, DEFAULT, 6.0, "explanation:advanced")
+
+    assert router.candidates("test_generation") == [FAST, DEFAULT]
+    assert router.candidates("explanation:advanced") == [DEFAULT, FAST]
+
+
+def stub_api_manager(config, responses):
+    """APIManager whose requests return the given (response, retryable) per model"""
+    api_manager = APIManager()
+    api_manager.config = config
+    api_manager.router = ModelRouter(config)
+    calls = []
+
+    def post(model_name, data, timeout):
+        calls.append(model_name)
+        return responses[model_name]
+
+    api_manager._post = post
+    return api_manager, calls
+
+
+def test_falls_back_to_the_next_model_on_a_retryable_error(config):
+    api_manager, calls = stub_api_manager(config, {
+        FAST: ({"error": "API error: 503"}, True),
+        DEFAULT: ({"candidates": []}, False),
+    })
+
+    assert api_manager.make_gemini_request("hi", call_site="chat") == {"candidates": []}
+    assert calls == [FAST, DEFAULT]
+    assert api_manager.router.stats()[FAST]["error_rate"] > 0
+
+
+def test_does_not_fall_back_on_a_non_retryable_error(config):
+    api_manager, calls = stub_api_manager(config, {
+        FAST: ({"error": "API error: 400"}, False),
+        DEFAULT: ({"candidates": []}, False),
+    })
+
+    assert api_manager.make_gemini_request("hi", call_site="chat") == {"error": "API error: 400"}
+    assert calls == [FAST]
@@ -0,0 +1,83 @@
+import gzip
+import json
+import pytest
+from flask import Flask, jsonify
+import responses
+
+BIG = {"items": [f"item {i}" for i in range(200)]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # gzip is always available; brotli may not be installed
+    monkeypatch.setattr(responses, "brotli", None)
+    app = Flask(__name__)
+    app.config['COMPRESS_MIN_SIZE'] = 512
+    app.after_request(responses.finalize_json)
+
+    @app.route('/big', methods=['GET', 'POST'])
+    def big():
+        return jsonify(BIG)
+
+    @app.route('/small')
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route('/missing')
+    def missing():
+        return jsonify({"error": "Not found"}), 404
+
+    return app.test_client()
+
+
+def get(client, path, encoding="gzip", etag=None):
+    headers = {"Accept-Encoding": encoding}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(path, headers=headers)
+
+
+def test_compresses_large_responses_the_client_accepts(client):
+    response = get(client, '/big')
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.get_data())) == BIG
+
+    plain = get(client, '/big', encoding="identity")
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_json() == BIG
+
+
+def test_small_responses_are_not_compressed(client):
+    response = get(client, '/small')
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json() == {"ok": True}
+
+
+def test_each_encoding_has_its_own_etag(client):
+    gzipped = get(client, '/big').headers['ETag']
+    plain = get(client, '/big', encoding="identity").headers['ETag']
+
+    assert gzipped != plain
+    assert gzipped.strip('"').endswith('-gzip')
+    assert get(client, '/big').headers['ETag'] == gzipped
+
+
+def test_matching_etag_returns_304_without_a_body(client):
+    etag = get(client, '/big').headers['ETag']
+
+    response = get(client, '/big', etag=etag)
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert 'Content-Encoding' not in response.headers
+
+    # A tag for another encoding does not match
+    assert get(client, '/big', encoding="identity", etag=etag).status_code == 200
+
+
+def test_only_successful_gets_are_tagged(client):
+    assert 'ETag' not in client.post('/big', headers={"Accept-Encoding": "gzip"}).headers
+    missing = get(client, '/missing')
+    assert missing.status_code == 404
+    assert 'ETag' not in missing.headers
@@ -0,0 +1,116 @@
+import queue
+import time
+import test_events
+import test_simulator
+
+QUESTIONS = [
+    {"type": "true/false", "question": "The sky is blue.", "answer": "true"},
+    {"type": "true/false", "question": "Fire is cold.", "answer": "false"},
+]
+
+
+class StubAPI:
+    def generate_test_questions(self, topic, num_questions, difficulty, question_types):
+        return {"questions": QUESTIONS}
+
+
+def make_hub():
+    simulator = test_simulator.TestSimulator(StubAPI())
+    completions = []
+    simulator.add_listener(
+        lambda event, test_id, results: completions.append(test_id) if event == "completed" else None
+    )
+    hub = test_events.TestEventHub(simulator, checkpoint_interval=60)
+    return simulator, hub, completions
+
+
+def start_test(simulator, duration_seconds):
+    test_id = simulator.create_test("sky", 2, "easy", ["true/false"], duration_seconds / 60)["test_id"]
+    simulator.start_test(test_id)
+    return test_id
+
+
+def next_event(events, name, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        event, data = events.get(timeout=max(0.01, deadline - time.monotonic()))
+        if event == name:
+            return data
+
+
+def test_expires_test_on_time_and_publishes_results():
+    simulator, hub, completions = make_hub()
+    test_id = start_test(simulator, 0.5)
+    events = hub.subscribe(test_id)
+    simulator.submit_answer(test_id, "true")
+
+    started = time.monotonic()
+    results = next_event(events, "completed")
+
+    assert 0.4 <= time.monotonic() - started < 3
+    assert simulator.active_tests[test_id]["status"] == "completed"
+    # The answer given before expiry is in the results
+    assert results["detailed_results"][0]["user_answer"] == "true"
+    assert completions == [test_id]
+
+
+def test_completion_is_idempotent():
+    simulator, hub, completions = make_hub()
+    test_id = start_test(simulator, 0.5)
+    events = hub.subscribe(test_id)
+
+    first = simulator.complete_test(test_id)
+    second = simulator.complete_test(test_id)
+    assert first == second
+
+    # The expiry timer fires later and must not complete the test again
+    time.sleep(1)
+    assert completions == [test_id]
+    assert simulator.expire_test(test_id) is None
+    published = []
+    while True:
+        try:
+            published.append(events.get_nowait()[0])
+        except queue.Empty:
+            break
+    assert published.count("completed") == 1
+
+
+def test_expire_test_ignores_tests_with_time_left():
+    simulator, hub, completions = make_hub()
+    test_id = start_test(simulator, 60)
+
+    assert simulator.expire_test(test_id) is None
+    assert simulator.active_tests[test_id]["status"] == "in_progress"
+    assert completions == []
+
+
+def test_answers_after_expiry_are_rejected():
+    simulator, hub, _ = make_hub()
+    test_id = start_test(simulator, 0.3)
+    next_event(hub.subscribe(test_id), "completed")
+
+    assert "error" in simulator.submit_answer(test_id, "true")
+
+
+def test_start_test_only_starts_created_tests():
+    simulator, hub, completions = make_hub()
+    test_id = start_test(simulator, 60)
+    events = hub.subscribe(test_id)
+    start_time = simulator.active_tests[test_id]["start_time"]
+
+    assert simulator.start_test(test_id) == {"error": "Test has already been started"}
+    simulator.complete_test(test_id)
+    assert simulator.start_test(test_id) == {"error": "Test has already been started"}
+
+    assert simulator.active_tests[test_id]["status"] == "completed"
+    assert simulator.active_tests[test_id]["start_time"] == start_time
+    assert completions == [test_id]
+    published = []
+    while True:
+        try:
+            published.append(events.get_nowait()[0])
+        except queue.Empty:
+            break
+    # A restart would have published a tick and rescheduled the expiry
+    assert published == ["completed"]
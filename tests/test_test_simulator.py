@@ -0,0 +1,87 @@
+import pytest
+import test_simulator
+
+QUESTIONS = [
+    {"type": "multiple choice", "question": f"Question {i}?",
+     "options": [f"q{i} option {j}" for j in range(4)], "answer": f"q{i} option {i % 4}"}
+    for i in range(6)
+]
+STUDENTS = ["ana", "ben", "cy", "dee"]
+
+
+class StubAPI:
+    def generate_test_questions(self, topic, num_questions, difficulty, question_types):
+        return {"questions": QUESTIONS}
+
+
+@pytest.fixture
+def simulator():
+    return test_simulator.TestSimulator(StubAPI())
+
+
+def answer_all(simulator, test_id, wrong=()):
+    """Answer every question as presented, correctly unless its text is in wrong"""
+    shown = []
+    step = simulator.start_test(test_id)
+    while "error" not in step:
+        question = step["question"]
+        original = next(q for q in QUESTIONS if q["question"] == question["question"])
+        if question["question"] in wrong:
+            answer = next(o for o in question["options"] if o != original["answer"])
+        else:
+            answer = original["answer"]
+        assert answer in question["options"]
+        simulator.submit_answer(test_id, answer)
+        shown.append(question)
+        step = simulator.get_next_question(test_id)
+
+    simulator.complete_test(test_id)
+    return shown
+
+
+def test_seeded_tests_shuffle_questions_and_options_per_student(simulator):
+    created = simulator.create_class_tests("t", 6, "easy", ["multiple choice"], 10, STUDENTS)
+    orders = []
+    for entry in created["tests"]:
+        shown = answer_all(simulator, entry["test_id"])
+        orders.append([q["question"] for q in shown])
+        for question in shown:
+            original = next(q for q in QUESTIONS if q["question"] == question["question"])
+            assert sorted(question["options"]) == sorted(original["options"])
+
+    assert all(sorted(order) == sorted(q["question"] for q in QUESTIONS) for order in orders)
+    assert len({tuple(order) for order in orders}) > 1
+    # The shared question list itself is never reordered
+    assert [q["options"] for q in simulator.classes[created["class_id"]]["questions"]] == \
+        [q["options"] for q in QUESTIONS]
+
+
+def test_results_map_shuffled_answers_back_to_the_original_questions(simulator):
+    created = simulator.create_class_tests("t", 6, "easy", ["multiple choice"], 10, STUDENTS)
+    test_id = created["tests"][0]["test_id"]
+    answer_all(simulator, test_id, wrong={"Question 2?", "Question 5?"})
+
+    results = simulator._calculate_results(simulator.active_tests[test_id])
+    assert results["correct_answers"] == 4
+    for result in results["detailed_results"]:
+        original = QUESTIONS[result["question_index"]]
+        assert result["question"] == original["question"]
+        assert result["correct_answer"] == original["answer"]
+        assert result["is_correct"] == (original["question"] not in {"Question 2?", "Question 5?"})
+
+
+def test_class_results_count_correct_answers_per_original_question(simulator):
+    created = simulator.create_class_tests("t", 6, "easy", ["multiple choice"], 10, STUDENTS)
+    tests = {entry["student"]: entry["test_id"] for entry in created["tests"]}
+    # dee never finishes, so only three students are counted
+    answer_all(simulator, tests["ana"], wrong={"Question 0?"})
+    answer_all(simulator, tests["ben"], wrong={"Question 0?", "Question 3?"})
+    answer_all(simulator, tests["cy"])
+
+    summary = simulator.get_class_results(created["class_id"])
+    assert summary["completed"] == 3
+    assert [s["correct_answers"] for s in summary["students"] if s["status"] == "completed"] == [5, 4, 6]
+    assert summary["questions"] == [
+        {"question": q["question"], "correct_rate": rate}
+        for q, rate in zip(QUESTIONS, [33.33, 100.0, 100.0, 66.67, 100.0, 100.0])
+    ]